@@ -0,0 +1,156 @@
+"""
+Offline benchmark for the "Hey TARS" wake word models.
+
+Streams a labeled corpus of 16 kHz mono WAV clips through each model/backend 80 ms at a time (the
+same way ListenController does) and reports:
+- per-frame inference time percentiles and real-time factor
+- false-accept / false-reject rates at several thresholds
+- peak RSS of the process running the model
+
+Every model runs in its own process so the peak RSS numbers don't bleed into each other.
+
+Usage (from the repo root):
+    python activation_model/benchmark_wake_word.py
+    python activation_model/benchmark_wake_word.py --corpus activation_model/training/riley --thresholds 0.3 0.5 0.7
+"""
+
+import argparse, os, resource, time, wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(MODEL_DIR, "training", "riley")
+FRAME_SAMPLES = 1280
+SAMPLE_RATE = 16_000
+PADDING_SECONDS = 1.0
+
+# (label, model file, inference framework)
+MODELS = [
+    ("onnx", "hey_tars.onnx", "onnx"),
+    ("tflite", "hey_tars.tflite", "tflite"),
+    ("tflite_float16", "hey_tars_float16.tflite", "tflite"),
+]
+
+def load_clip(path: str) -> np.ndarray:
+    """
+    Loads a 16 kHz, 16-bit, mono WAV clip.
+    """
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError(f"'{path}' is not 16 kHz 16-bit mono (run train_verifier.py to convert it)")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+def load_corpus(corpus_dir: str) -> list:
+    """
+    Loads every WAV clip in the corpus' positive/ and negative/ folders.
+
+    Returns:
+        list: (path, label, samples) tuples, where label is 1 for positive clips and 0 for negative
+    """
+    clips = []
+    for folder, label in (("positive", 1), ("negative", 0)):
+        folder_path = os.path.join(corpus_dir, folder)
+        for filename in sorted(os.listdir(folder_path)):
+            if filename.lower().endswith(".wav"):
+                path = os.path.join(folder_path, filename)
+                clips.append((path, label, load_clip(path)))
+    return clips
+
+def benchmark_model(label: str, model_file: str, framework: str, corpus_dir: str) -> dict:
+    """
+    Streams the corpus through one model. Runs in a worker process.
+
+    Returns:
+        dict: Raw per-frame timings, per-clip max scores and labels, audio duration and peak RSS
+    """
+    import openwakeword as oww
+
+    clips = load_corpus(corpus_dir)
+    model = oww.Model(wakeword_models=[os.path.join(MODEL_DIR, model_file)], inference_framework=framework)
+    wake_word = next(iter(model.models)) # Named after the model file (e.g. hey_tars_float16)
+
+    padding = np.zeros(int(PADDING_SECONDS * SAMPLE_RATE), dtype=np.int16)
+    frame_times = []
+    max_scores = []
+    labels = []
+    audio_seconds = 0.0
+    for _, clip_label, samples in clips:
+        model.reset()
+        audio = np.concatenate((padding, samples, padding))
+        audio = audio[:len(audio) // FRAME_SAMPLES * FRAME_SAMPLES]
+        audio_seconds += len(audio) / SAMPLE_RATE
+
+        clip_max = 0.0
+        for start in range(0, len(audio), FRAME_SAMPLES):
+            started = time.perf_counter()
+            score = model.predict(audio[start:start + FRAME_SAMPLES])[wake_word]
+            frame_times.append(time.perf_counter() - started)
+            clip_max = max(clip_max, float(score))
+
+        max_scores.append(clip_max)
+        labels.append(clip_label)
+
+    return {
+        "label": label,
+        "frame_times": frame_times,
+        "max_scores": max_scores,
+        "labels": labels,
+        "audio_seconds": audio_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # ru_maxrss is in KiB on Linux
+    }
+
+def error_rates(max_scores: list, labels: list, threshold: float) -> tuple:
+    """
+    Gets the false-accept and false-reject rates at a threshold.
+
+    Returns:
+        tuple: (false-accept rate over negative clips, false-reject rate over positive clips)
+    """
+    scores = np.array(max_scores)
+    labels = np.array(labels)
+    positives = scores[labels == 1]
+    negatives = scores[labels == 0]
+
+    false_accept = float(np.mean(negatives >= threshold)) if len(negatives) else float("nan")
+    false_reject = float(np.mean(positives < threshold)) if len(positives) else float("nan")
+    return false_accept, false_reject
+
+def print_report(result: dict, thresholds: list):
+    """
+    Prints the benchmark report for one model.
+    """
+    frame_ms = np.array(result["frame_times"]) * 1000
+    p50, p90, p99 = np.percentile(frame_ms, [50, 90, 99])
+    rtf = np.sum(result["frame_times"]) / result["audio_seconds"]
+
+    print(f"=== {result['label']} ===")
+    print(f"  frames: {len(frame_ms)}  audio: {result['audio_seconds']:.1f}s  peak RSS: {result['peak_rss_mb']:.1f} MB")
+    print(f"  per-frame inference: p50 {p50:.2f} ms  p90 {p90:.2f} ms  p99 {p99:.2f} ms  max {frame_ms.max():.2f} ms")
+    print(f"  real-time factor: {rtf:.4f}")
+    for threshold in thresholds:
+        false_accept, false_reject = error_rates(result["max_scores"], result["labels"], threshold)
+        print(f"  threshold {threshold:.2f}: false-accept {false_accept:.1%}  false-reject {false_reject:.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Hey TARS wake word models on a labeled WAV corpus.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory with positive/ and negative/ WAV clips")
+    parser.add_argument("--models", nargs="+", default=[label for label, _, _ in MODELS], help="Models to benchmark")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    args = parser.parse_args()
+
+    for label, model_file, framework in MODELS:
+        if label not in args.models:
+            continue
+
+        # Fresh process per model, so peak RSS is the model's own
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                result = executor.submit(benchmark_model, label, model_file, framework, args.corpus).result()
+            except Exception as e:
+                print(f"=== {label} ===\n  ERROR: {e}")
+                continue
+
+        print_report(result, args.thresholds)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
 import openwakeword
-import os
-from pydub import AudioSegment 
+import argparse, hashlib, os, pickle, wave
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from openwakeword.custom_verifier_model import get_reference_clip_features, train_verifier_model
+from pydub import AudioSegment
 
 PERSON = "riley"
 
+TRAINING_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(os.path.dirname(TRAINING_DIR), "hey_tars.onnx")
+MODEL_NAME = "hey_tars"
+CACHE_DIR = os.path.join(TRAINING_DIR, ".feature_cache")
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg')
+
+# Feature extraction settings (same as openwakeword.train_custom_verifier): (threshold, N)
+POSITIVE_SETTINGS = (0.5, 5)
+NEGATIVE_SETTINGS = (0.0, 1)
+
 def absoluteFilePaths(directory):
     """
     Gets a list of absolute file paths for all files in a directory
@@ -12,56 +25,160 @@ def absoluteFilePaths(directory):
     for dirpath,_,filenames in os.walk(directory):
         for f in filenames:
             _.append(os.path.abspath(os.path.join(dirpath, f)))
-            
+
     return _
 
+def file_sha256(path):
+    """
+    Gets the SHA-256 hash of a file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_16k_mono(path):
+    """
+    Checks whether a file is already a 16 kHz, 16-bit, mono WAV
+    """
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getframerate() == 16000 and wav.getnchannels() == 1 and wav.getsampwidth() == 2
+    except (wave.Error, EOFError):
+        return False
+
 def convert_to_16k_mono(input_path, output_path):
     audio: AudioSegment = AudioSegment.from_file(input_path)
     audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
     audio.export(output_path, format="wav")
 
-def convert_directory(input_dir, output_dir):
-    os.makedirs(output_dir, exist_ok=True)
-    for filename in os.listdir(input_dir):
-        if filename.lower().endswith(('.wav', '.mp3', '.ogg')):
-            convert_to_16k_mono(
-                os.path.join(input_dir, filename),
-                os.path.join(output_dir, filename.replace(".mp3", ".wav").replace(".ogg", ".wav"))
-            )
+def prepare_clip(input_path):
+    """
+    Makes sure a clip is available as a 16 kHz mono WAV, converting it only if needed.
+    Runs in a worker process.
+
+    Returns:
+        str: The path of the 16 kHz mono WAV
+    """
+    output_path = os.path.splitext(input_path)[0] + ".wav"
+
+    # Already converted (either in place, or a WAV next to the original mp3/ogg)
+    if is_16k_mono(output_path) and (output_path == input_path or os.path.getmtime(output_path) >= os.path.getmtime(input_path)):
+        return output_path
+
+    convert_to_16k_mono(input_path, output_path)
+    return output_path
+
+def prepare_directory(input_dir, executor):
+    """
+    Converts every clip in a directory in parallel.
+
+    Returns:
+        list[str]: Paths of the 16 kHz mono WAV clips
+    """
+    clips = [path for path in absoluteFilePaths(input_dir) if path.lower().endswith(AUDIO_EXTENSIONS)]
+
+    # A WAV converted from an mp3/ogg sits next to it, so only keep one path per clip
+    return sorted(set(executor.map(prepare_clip, clips)))
+
+_worker_model = None
+
+def _init_feature_worker():
+    """
+    Loads a wake word model for this worker process.
+    """
+    global _worker_model
+    _worker_model = openwakeword.Model(wakeword_models=[MODEL_PATH], inference_framework="onnx")
+
+def extract_features(clip_path, cache_path, threshold, n):
+    """
+    Gets the wake model embedding features of a clip and caches them. Runs in a worker process.
+    """
+    _worker_model.reset()
+    features = get_reference_clip_features(clip_path, _worker_model, MODEL_NAME, threshold=threshold, N=n)
+    np.save(cache_path, features)
+    return features
+
+def load_features(clips, settings, executor):
+    """
+    Gets the features for every clip, reusing cached features where the clip hasn't changed.
+
+    Returns:
+        np.ndarray: The stacked features of every clip
+    """
+    threshold, n = settings
+    if not clips:
+        return np.empty((0, 16, 96), dtype=np.float32)
+
+    # Features depend on the clip, the wake model and the extraction settings
+    cache_dir = os.path.join(CACHE_DIR, file_sha256(MODEL_PATH)[:16])
+    os.makedirs(cache_dir, exist_ok=True)
+
+    features = {}
+    pending = {}
+    for clip in clips:
+        cache_path = os.path.join(cache_dir, f"{file_sha256(clip)}_{threshold}_{n}.npy")
+        if os.path.exists(cache_path):
+            features[clip] = np.load(cache_path)
+        else:
+            pending[clip] = executor.submit(extract_features, clip, cache_path, threshold, n)
+
+    print(f"{len(clips) - len(pending)} cached, {len(pending)} to process")
+    for clip, future in pending.items():
+        features[clip] = future.result()
+
+    return np.vstack([features[clip] for clip in clips])
 
 def main():
+    parser = argparse.ArgumentParser(description="Train a custom verifier model for the Hey TARS wake word.")
+    parser.add_argument("--person", default=PERSON, help="Name of the folder holding the positive/negative clips")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes for conversion and feature extraction")
+    args = parser.parse_args()
+
+    person_dir = os.path.join(TRAINING_DIR, args.person)
+
     # Check if person directory exists
-    if not os.path.exists(f"{os.getcwd()}/models/training/{PERSON}"):
-        print(f"ERROR: '{PERSON}' directory does not exist")
+    if not os.path.exists(person_dir):
+        print(f"ERROR: '{args.person}' directory does not exist")
         return
-    
+
     # Check if positive reference clips folder exists
-    if not os.path.exists(f"{os.getcwd()}/models/training/{PERSON}/positive"):
+    if not os.path.exists(os.path.join(person_dir, "positive")):
         print("ERROR: positive reference clips directory does not exist")
         return
-    
+
     # Check if negative reference clips folder exists
-    if not os.path.exists(f"{os.getcwd()}/models/training/{PERSON}/negative"):
+    if not os.path.exists(os.path.join(person_dir, "negative")):
         print("ERROR: negative reference clips directory does not exist")
         return
-    
-    # Convert the audio files to the correct format
-    base_dir = os.path.join(os.getcwd(), "models", "training", PERSON)
-
-    convert_directory(f"{os.getcwd()}/models/training/{PERSON}/positive", f"{os.getcwd()}/models/training/{PERSON}/positive")
-    convert_directory(f"{os.getcwd()}/models/training/{PERSON}/negative", f"{os.getcwd()}/models/training/{PERSON}/negative")
-    
-    # Get positive and negative reference clips
-    pos = absoluteFilePaths(f"{os.getcwd()}/models/training/{PERSON}/positive")
-    neg = absoluteFilePaths(f"{os.getcwd()}/models/training/{PERSON}/negative")
-    
+
+    # Convert the audio files to the correct format (clips that already are 16 kHz mono are skipped)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pos = prepare_directory(os.path.join(person_dir, "positive"), executor)
+        neg = prepare_directory(os.path.join(person_dir, "negative"), executor)
+
+    # Get the features of every clip (only new or changed clips go through the wake model)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_feature_worker) as executor:
+        print("Processing positive reference clips...")
+        positive_features = load_features(pos, POSITIVE_SETTINGS, executor)
+        print("Processing negative reference clips...")
+        negative_features = load_features(neg, NEGATIVE_SETTINGS, executor)
+
+    if positive_features.shape[0] == 0:
+        print("ERROR: no positive features were created; make sure the positive clips contain the wake phrase")
+        return
+
     # Train the custom verifier
-    openwakeword.train_custom_verifier(
-        positive_reference_clips = pos,
-        negative_reference_clips = neg,
-        output_path = f"{os.getcwd()}/models/training/{PERSON}_model.pkl",
-        model_name = f"{os.getcwd()}\\models\\hey_tars.onnx"
+    print("Training and saving verifier model...")
+    verifier = train_verifier_model(
+        np.vstack((positive_features, negative_features)),
+        np.array([1] * positive_features.shape[0] + [0] * negative_features.shape[0])
     )
 
+    with open(os.path.join(TRAINING_DIR, f"{args.person}_model.pkl"), "wb") as f:
+        pickle.dump(verifier, f)
+    print("Done!")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,7 +1,10 @@
 from google import genai
 from google.genai import types
+from modules.helpers.conversation_context import ConversationContext
+from modules.helpers.sentence_segmenter import SentenceSegmenter
+from typing import Callable
 from modules.models.personality_parameters import PersonalityParameters
-import dotenv, logging
+import asyncio, dotenv, logging
 import sounddevice
 
 AUTO_FUNCTION_CALLING = False
@@ -11,7 +14,8 @@ class ConvoController():
     Controller for conversation generation using the Gemini API
     """
 
-    def __init__(self, env_path: str = "../.env", function_declarations: list = []):
+    def __init__(self, env_path: str = "../.env", function_declarations: list = [], context_token_budget: int = 4000,
+                 context_summary_budget: int = 400, request_timeout: float = 20.0):
         # Initialize logger
         self.logger = logging.getLogger('convo_controller')
         self.logger.info("Initializing ConvoController...")
@@ -20,6 +24,7 @@ class ConvoController():
         self.api_key = dotenv.get_key(dotenv_path=env_path, key_to_get="GEMINI_API_KEY")
         self.model = "gemini-2.0-flash-lite"
         self.function_declarations = function_declarations
+        self.request_timeout = request_timeout # Seconds a request (a whole streamed response included) may take
         
         # Source: the TARS/Interstellar Fandom page (https://interstellarfilm.fandom.com/wiki/TARS)
         self.backstory = """"TARS is one of four former U.S. Marine Corps tactical robots along with PLEX, CASE and KIPP featured in the Interstellar universe. He is one of the crew members of Endurance along with Cooper, Brand, Doyle, Romilly, and CASE. TARS' personality can be characterized as witty, sarcastic, and humorous, traits programmed into him to make him a better suited companion. TARS also appears to be somewhat more versatile than CASE, being suited for tasks ranging from piloting to data collection.
@@ -59,8 +64,8 @@ class ConvoController():
         EXAMPLES:
         {self.examples}"""
         
-        # Conversation memory
-        self.memory: list[types.Content] = []
+        # Conversation memory (history sent with every request, older turns compacted into a rolling summary)
+        self.context = ConversationContext(token_budget=context_token_budget, summary_budget=context_summary_budget)
         
         # Load API clients
         self.client = genai.Client(api_key=self.api_key)
@@ -108,77 +113,197 @@ class ConvoController():
         """
         Resets the conversation memory.
         """
-        self.memory = []
+        self.context.clear()
         self.logger.info("Conversation memory reset.")
 
-    def send_message(self, msg: str, personality_parameters: PersonalityParameters = None) -> tuple[str, types.FunctionCall]:
+    @staticmethod
+    def _model_content(response: types.GenerateContentResponse) -> types.Content:
         """
-        Sends a message for TARS to respond to.
+        Gets the model's turn from a response (function call parts included) for the conversation memory.
+        """
+        if response.candidates and response.candidates[0].content is not None:
+            return response.candidates[0].content
+        return types.Content(role="model", parts=[types.Part(text=response.text or "")])
+
+    def _start_message(self, msg: str, personality_parameters: PersonalityParameters = None) -> list[types.Content]:
+        """
+        Starts a new exchange in the conversation memory.
         
-        @returns str - The response to the sent message
+        @returns list[types.Content] - The contents to send (history, then the new message)
         """
-            
         message_text = ""
         if personality_parameters is not None:
             message_text += f"CURRENT PERSONALITY PARAMETERS: {personality_parameters}\n"
             
         message_text += f"NEW USER MESSAGE: '{msg}'"
         
-        user_contents = [
-            types.Content(
-                role = "user",
-                parts=[types.Part(text=message_text)]
-            )
-        ]
+        # Only the message itself is remembered; the personality parameters are sent with the newest message
+        self.context.start_exchange(types.Content(role="user", parts=[types.Part(text=f"USER MESSAGE: '{msg}'")]))
+        contents = self.context.contents()
+        contents[-1] = types.Content(role="user", parts=[types.Part(text=message_text)])
+        return contents
+    
+    @staticmethod
+    def _same_call(a: types.FunctionCall, b: types.FunctionCall) -> bool:
+        """Checks whether two function calls are the same call (by id if they have one, otherwise by name)."""
+        if a.id or b.id:
+            return a.id == b.id
+        return a.name == b.name
+
+    def _add_function_results(self, results: list[tuple[types.FunctionCall, any]]) -> list[types.Content]:
+        """
+        Adds the results of a response's function calls to the current exchange in the conversation memory.
+        Every call gets a response (None becomes "Done."), since Gemini rejects unanswered calls.
         
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=user_contents,
-            config=self.config
-        )
+        @param results - (function call, result) pairs
+        @returns list[types.Content] - The contents to send
+        """
+        # Append the function calls the model's last remembered turn doesn't already have. Calls are paired
+        # up by position (and id, when Gemini sends one), since the same function can be called twice.
+        exchange = self.context.exchanges[-1] if self.context.exchanges else []
+        pending = [part.function_call for part in exchange[-1].parts or [] if part.function_call is not None] \
+            if exchange and exchange[-1].role == "model" else []
+        missing = [types.Part(function_call=function_call) for i, (function_call, _) in enumerate(results)
+                   if not (i < len(pending) and self._same_call(pending[i], function_call))]
+        if missing:
+            self.context.append(types.Content(role="model", parts=missing))
         
-        # Update conversation memory with the new message and response
-        self.memory.append(user_contents)
+        # All the results go back together, one part per call
+        self.context.append(types.Content(role="user", parts=[
+            types.Part(function_response=types.FunctionResponse(
+                id=function_call.id, name=function_call.name, response={"result": result if result is not None else "Done."}))
+            for function_call, result in results]))
+        return self.context.contents()
+    
+    def record_function_results(self, results: list[tuple[types.FunctionCall, any]]):
+        """
+        Remembers the results of a response's function calls without sending them (when there is
+        nothing for TARS to say about them), so the calls are still answered in the history.
         
-        ai_contents = [
-            types.Content(
-                role = "model",
-                parts=[types.Part(text=response.text)]
-            )
-        ]
+        @param results - (function call, result) pairs
+        """
+        self._add_function_results(results)
+    
+    def drop_unanswered_function_calls(self):
+        """
+        Forgets the function calls of the last response if their results will never be sent (the
+        request timed out or was cancelled while they ran).
+        """
+        dropped = self.context.drop_unanswered_calls()
+        if dropped:
+            self.logger.info(f"Dropped {dropped} unanswered function call(s) from the conversation memory.")
+    
+    def record_exchange(self, msg: str, function_call: types.FunctionCall, function_result: any, reply: str = None):
+        """
+        Remembers an exchange that was handled without Gemini (e.g. by the local intent matcher), so
+        later turns still know it happened.
+        """
+        self.context.start_exchange(types.Content(role="user", parts=[types.Part(text=f"USER MESSAGE: '{msg}'")]))
+        self._add_function_results([(function_call, function_result)])
+        if reply:
+            self.context.append(types.Content(role="model", parts=[types.Part(text=reply)]))
+    
+    async def _generate(self, contents: list[types.Content], timeout: float = None) -> types.GenerateContentResponse:
+        """
+        Generates a (non-streamed) response without blocking the event loop, and remembers it.
         
-        self.memory.append(ai_contents)
+        @raises asyncio.TimeoutError - If the request takes longer than the timeout
+        """
+        response = await asyncio.wait_for(
+            self.client.aio.models.generate_content(model=self.model, contents=contents, config=self.config),
+            timeout=timeout if timeout is not None else self.request_timeout)
         
-        return (response.text, response.function_calls[0] if response.function_calls is not None else None)
+        # Update conversation memory with the response
+        self.context.append(self._model_content(response))
+        return response
     
-    def send_function_result(self, function_call: types.FunctionCall, function_result: any) -> str:
+    async def _stream(self, contents: list[types.Content], on_segment: Callable[[str], None], timeout: float = None) -> tuple[str, list[types.FunctionCall]]:
         """
-        Sends the result of a function call back to TARS.
+        Streams a response, calling `on_segment` with each sentence as soon as it is complete.
+        
+        If the stream times out or is cancelled, whatever text was already generated is still
+        remembered (it may already have been spoken) before the error propagates. Function calls
+        are only remembered from a complete response, since an interrupted one never gets its results.
         
-        @returns str - The response to the sent message
+        @returns tuple - The full response text and any function calls
+        @raises asyncio.TimeoutError - If the whole response takes longer than the timeout
         """
+        segmenter = SentenceSegmenter()
+        text = ""
+        function_calls = []
         
-        # Create a new content object for the function result
-        function_result_content = types.Part.from_function_response(
-            name=function_call.name,
-            response={"result": function_result},
-        )
+        async def consume():
+            nonlocal text
+            async for chunk in await self.client.aio.models.generate_content_stream(model=self.model, contents=contents, config=self.config):
+                if chunk.function_calls:
+                    function_calls.extend(chunk.function_calls)
+                
+                chunk_text = chunk.text if chunk.candidates and chunk.candidates[0].content else None
+                if chunk_text:
+                    text += chunk_text
+                    for segment in segmenter.feed(chunk_text):
+                        on_segment(segment)
+            
+            remaining = segmenter.flush()
+            if remaining is not None:
+                on_segment(remaining)
         
-        # Append the function call and function result to the conversation memory
-        function_call_message = types.Content(role="model", parts=[types.Part(function_call=function_call)])
-        function_call_result = types.Content(role="user", parts=[function_result_content])
+        completed = False
+        try:
+            await asyncio.wait_for(consume(), timeout=timeout if timeout is not None else self.request_timeout)
+            completed = True
+        finally:
+            # Update conversation memory with the (possibly partial) response
+            parts = [types.Part(text=text)] if text else []
+            if completed:
+                parts += [types.Part(function_call=call) for call in function_calls]
+            if parts:
+                self.context.append(types.Content(role="model", parts=parts))
         
-        # Generate a response based on the function result
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=[function_call_message, function_call_result],
-            config=self.config
-        )
+        return text, function_calls
+
+    async def send_message(self, msg: str, personality_parameters: PersonalityParameters = None, timeout: float = None) -> tuple[str, list[types.FunctionCall]]:
+        """
+        Sends a message for TARS to respond to.
+        
+        @returns tuple - The response text and every function call in the response
+        @raises asyncio.TimeoutError - If the request takes longer than the timeout (default `request_timeout`)
+        """
+        response = await self._generate(self._start_message(msg, personality_parameters), timeout)
+        return (response.text, response.function_calls or [])
+    
+    async def stream_message(self, msg: str, on_segment: Callable[[str], None], personality_parameters: PersonalityParameters = None,
+                             timeout: float = None) -> tuple[str, list[types.FunctionCall]]:
+        """
+        Sends a message for TARS to respond to, streaming the response. `on_segment` is called with
+        each sentence as soon as it has been generated.
         
-        # Update conversation memory with the new message and response
-        self.memory.append(function_call_message)
-        self.memory.append(function_call_result)
-        self.memory.append(response)
+        @returns tuple - The full response text and every function call in the response
+        @raises asyncio.TimeoutError - If the response takes longer than the timeout (default `request_timeout`)
+        """
+        return await self._stream(self._start_message(msg, personality_parameters), on_segment, timeout)
+    
+    async def send_function_results(self, results: list[tuple[types.FunctionCall, any]], timeout: float = None) -> tuple[str, list[types.FunctionCall]]:
+        """
+        Sends the results of a response's function calls back to TARS in a single request. The reply
+        may call more functions; their results have to be sent the same way.
         
-        return response.text
+        @param results - (function call, result) pairs
+        @returns tuple - The response text and every function call in the response
+        @raises asyncio.TimeoutError - If the request takes longer than the timeout (default `request_timeout`)
+        """
+        response = await self._generate(self._add_function_results(results), timeout)
+        return (response.text, response.function_calls or [])
+    
+    async def stream_function_results(self, results: list[tuple[types.FunctionCall, any]], on_segment: Callable[[str], None],
+                                      timeout: float = None) -> tuple[str, list[types.FunctionCall]]:
+        """
+        Sends the results of a response's function calls back to TARS in a single request, streaming
+        the response sentence by sentence into `on_segment`. The reply may call more functions; their
+        results have to be sent the same way.
         
+        @param results - (function call, result) pairs
+        @returns tuple - The full response text and every function call in the response
+        @raises asyncio.TimeoutError - If the response takes longer than the timeout (default `request_timeout`)
+        """
+        return await self._stream(self._add_function_results(results), on_segment, timeout)
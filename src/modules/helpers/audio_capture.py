@@ -0,0 +1,247 @@
+"""
+Persistent microphone capture for TARS.
+
+A single capture thread keeps one PyAudio input stream open for the lifetime of the program and
+writes fixed-size frames into a preallocated int16 ring buffer. Consumers (wake word, speech-to-text,
+metering) each get an AudioCaptureReader with its own read cursor, and read frames as zero-copy
+views into the ring buffer.
+
+Positions are absolute sample counts since capture started. The ring buffer capacity is a whole
+number of frames and frames are always written whole, so any frame-aligned position maps onto a
+contiguous slice of the buffer.
+
+The time each frame arrived is kept alongside it, so audio can be lined up with what the speaker
+was playing at the same moment (for echo suppression).
+"""
+
+import logging, math, threading, time
+import numpy as np
+import pyaudio
+
+class AudioCapture:
+    """
+    Always-open microphone capture service backed by a preallocated ring buffer.
+    """
+
+    def __init__(self, sample_rate: int = 16_000, frame_samples: int = 1280, buffer_seconds: float = 10.0, device_index: int = None):
+        """
+        Initialize the capture service (the stream is not opened until start() is called).
+
+        Args:
+            sample_rate (int): Capture sample rate in Hz
+            frame_samples (int): Samples per frame handed to consumers (1280 = 80 ms at 16 kHz)
+            buffer_seconds (float): Seconds of audio history kept in the ring buffer
+            device_index (int): PyAudio input device index (default: system default input)
+        """
+        self.logger = logging.getLogger('audio_capture')
+
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.device_index = device_index
+
+        # Preallocate the ring buffer as a whole number of frames
+        self.capacity = math.ceil(buffer_seconds * sample_rate / frame_samples) * frame_samples
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.frame_times = np.zeros(self.capacity // frame_samples) # time.perf_counter() each frame slot was written
+        self.input_latency = 0.0
+
+        # Absolute number of samples written since capture started
+        self.write_position = 0
+        self._condition = threading.Condition()
+
+        self._pyaudio = None
+        self._stream = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def frame_duration(self) -> float:
+        """Duration of a single frame in seconds."""
+        return self.frame_samples / self.sample_rate
+
+    @property
+    def oldest_position(self) -> int:
+        """Oldest absolute sample position still held in the ring buffer."""
+        return max(0, self.write_position - self.capacity)
+
+    def start(self):
+        """Opens the input stream and starts the capture thread."""
+        if self._running:
+            return
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frame_samples)
+        self.input_latency = self._stream.get_input_latency()
+
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="audio_capture", daemon=True)
+        self._thread.start()
+
+        self.logger.info(f"Audio capture started ({self.sample_rate} Hz, {self.capacity / self.sample_rate:.1f}s ring buffer).")
+
+    def stop(self):
+        """Stops the capture thread and closes the input stream."""
+        if not self._running:
+            return
+
+        self._running = False
+        self._thread.join(timeout=1.0)
+
+        try:
+            self._stream.stop_stream()
+        finally:
+            self._stream.close()
+            self._pyaudio.terminate()
+
+        # Wake any readers blocked on new audio
+        with self._condition:
+            self._condition.notify_all()
+
+        self.logger.info("Audio capture stopped.")
+
+    def _capture_loop(self):
+        """Reads whole frames from the stream into the ring buffer."""
+        while self._running:
+            try:
+                data = self._stream.read(self.frame_samples, exception_on_overflow=False)
+            except OSError as e:
+                self.logger.error(f"Error reading from the input stream: {e}")
+                continue
+
+            # Copy the frame into its slot; frames never straddle the end of the buffer
+            slot = self.write_position % self.capacity
+            self.buffer[slot:slot + self.frame_samples] = np.frombuffer(data, dtype=np.int16)
+            self.frame_times[slot // self.frame_samples] = time.perf_counter()
+
+            with self._condition:
+                self.write_position += self.frame_samples
+                self._condition.notify_all()
+
+    def wait_for(self, position: int, timeout: float = None) -> bool:
+        """
+        Blocks until audio up to the given absolute position has been written.
+
+        Returns:
+            bool: True if the audio is available, False on timeout or if capture stopped
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.write_position >= position or not self._running, timeout=timeout) \
+                and self.write_position >= position
+
+    def time_at(self, position: int) -> float:
+        """
+        Estimates when the sound at an absolute position (still in the ring buffer) reached the microphone.
+
+        Returns:
+            float: A time.perf_counter() time
+        """
+        slot = position % self.capacity
+        frame_end = slot // self.frame_samples * self.frame_samples + self.frame_samples
+        return self.frame_times[slot // self.frame_samples] - (frame_end - slot) / self.sample_rate - self.input_latency
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        Gets the audio between two absolute positions. Returns a zero-copy view when the range is
+        contiguous in the ring buffer, and a copy only when it wraps around the end.
+        """
+        start = max(start, self.oldest_position)
+        if end <= start:
+            return self.buffer[0:0]
+
+        start_slot = start % self.capacity
+        end_slot = start_slot + (end - start)
+        if end_slot <= self.capacity:
+            return self.buffer[start_slot:end_slot]
+
+        return np.concatenate((self.buffer[start_slot:], self.buffer[:end_slot - self.capacity]))
+
+    def latest(self, n_samples: int) -> np.ndarray:
+        """Gets (up to) the most recent n_samples of audio without consuming it."""
+        end = self.write_position
+        return self.view(end - n_samples, end)
+
+    def reader(self, position: int = None) -> "AudioCaptureReader":
+        """
+        Creates a new consumer with its own read cursor.
+
+        Args:
+            position (int): Absolute position to start reading from (default: the live edge)
+        """
+        return AudioCaptureReader(self, self.write_position if position is None else position)
+
+class AudioCaptureReader:
+    """
+    Independent read cursor over an AudioCapture ring buffer.
+
+    Frames are returned as views into the shared ring buffer. A view stays valid until the capture
+    thread wraps around and overwrites it, so consumers must finish with a frame well within the
+    buffer length (10 seconds by default).
+    """
+
+    def __init__(self, capture: AudioCapture, position: int):
+        self.capture = capture
+        self.position = 0
+        self.overruns = 0
+        self.seek(position)
+
+    @property
+    def available(self) -> int:
+        """Number of samples written but not yet read by this reader."""
+        return self.capture.write_position - self.position
+
+    def seek(self, position: int):
+        """Moves the cursor to the given absolute position (rounded down to a frame boundary)."""
+        frame_samples = self.capture.frame_samples
+        self.position = max(0, (position // frame_samples) * frame_samples)
+
+    def _skip_overrun(self):
+        """Jumps forward if the capture thread has overwritten unread audio."""
+        oldest = self.capture.oldest_position
+        if self.position < oldest:
+            # Land one frame past the oldest so the next write doesn't immediately overwrite us
+            self.overruns += 1
+            self.seek(oldest + self.capture.frame_samples)
+
+    def read_frame(self, timeout: float = None) -> np.ndarray:
+        """
+        Reads the next frame, blocking until it has been captured.
+
+        Returns:
+            np.ndarray: A zero-copy view of frame_samples int16 samples, or None on timeout
+        """
+        frame_samples = self.capture.frame_samples
+        if not self.capture.wait_for(self.position + frame_samples, timeout=timeout):
+            return None
+
+        self._skip_overrun()
+
+        slot = self.position % self.capture.capacity
+        self.position += frame_samples
+        return self.capture.buffer[slot:slot + frame_samples]
+
+    def read_frames(self, max_frames: int, timeout: float = None) -> np.ndarray:
+        """
+        Reads all frames that are available (at least one, at most max_frames), blocking until one
+        has been captured.
+
+        Returns:
+            np.ndarray: A zero-copy (n_frames, frame_samples) view, or None on timeout
+        """
+        frame_samples = self.capture.frame_samples
+        if not self.capture.wait_for(self.position + frame_samples, timeout=timeout):
+            return None
+
+        self._skip_overrun()
+
+        # Stop at the end of the ring buffer so the result stays a single view
+        slot = self.position % self.capture.capacity
+        n_frames = min(max_frames, self.available // frame_samples, (self.capture.capacity - slot) // frame_samples)
+
+        self.position += n_frames * frame_samples
+        return self.capture.buffer[slot:slot + n_frames * frame_samples].reshape(n_frames, frame_samples)
@@ -0,0 +1,283 @@
+"""
+Persistent audio output for TARS' voice.
+
+One output stream is opened at startup and kept running; everything TARS says (streamed TTS,
+cached audio, fillers) is written into a bounded PCM jitter buffer that the stream's callback
+drains. This removes the device setup cost of opening a stream per utterance, and because every
+sample has an absolute position, playback timing is known precisely: callers can wait for a
+position to be played, or run a callback the moment it becomes audible.
+
+Writers that get ahead of playback wait for space in the buffer, so memory use stays bounded
+however much audio is queued.
+
+Everything the device plays (silence included) is also kept for a few seconds, along with when it
+was audible, as the reference signal for echo suppression on the microphone.
+"""
+
+import asyncio, collections, logging, threading, time
+import numpy as np
+import sounddevice as sd
+
+class AudioOutput:
+    """
+    Long-lived output stream fed by a bounded ring buffer of int16 PCM.
+    """
+
+    def __init__(self, sample_rate: int = 24_000, block_size: int = 480, buffer_seconds: float = 2.0, fade_seconds: float = 0.01,
+                 history_seconds: float = 4.0, device_index: int = None):
+        """
+        Args:
+            sample_rate (int): Output sample rate (OpenAI TTS PCM is 24 kHz)
+            block_size (int): Samples per callback (480 = 20 ms at 24 kHz)
+            buffer_seconds (float): Capacity of the jitter buffer
+            fade_seconds (float): Fade-out applied when playback is cut off, so it never clicks
+            history_seconds (float): Seconds of played audio kept as the echo reference
+            device_index (int): Output device (default device if None)
+        """
+        self.logger = logging.getLogger('audio_output')
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.fade_samples = int(fade_seconds * sample_rate)
+        self.device_index = device_index
+
+        self.capacity = int(buffer_seconds * sample_rate)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.write_position = 0   # Absolute sample positions since the stream started
+        self.read_position = 0
+        self.generation = 0       # Bumped by cut(); writes from an older generation stop
+        self.underruns = 0        # Times the buffer ran dry while a write was still in progress
+        self.drained_at = None    # time.perf_counter() when the buffer last ran dry
+        self.lock = threading.Lock()
+
+        # What the device played, indexed by device sample count, and when blocks of it were audible
+        self.history = np.zeros(int(history_seconds * sample_rate), dtype=np.int16)
+        self.played = 0
+        self._clock = collections.deque(maxlen=64) # (device sample count, time.perf_counter() audible)
+
+        self._markers: list = []  # [position, callback, loop, fire_on_cut], sorted by position
+        self._pending_writes = 0
+        self._space: asyncio.Event = None
+        self._loop: asyncio.AbstractEventLoop = None
+        self.stream: sd.OutputStream = None
+
+    def start(self):
+        """
+        Opens and starts the output stream.
+        """
+        self.stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            channels=1,
+            dtype="int16",
+            latency="low",
+            device=self.device_index,
+            callback=self._callback)
+        self.stream.start()
+        self.logger.info(f"Audio output started ({self.sample_rate} Hz, {self.block_size}-sample blocks, {self.latency * 1000:.0f} ms device latency)")
+
+    def stop(self):
+        """
+        Stops and closes the output stream.
+        """
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    @property
+    def latency(self) -> float:
+        """Seconds from a sample leaving the buffer to it being audible."""
+        return self.stream.latency if self.stream is not None else 0.0
+
+    @property
+    def buffered(self) -> int:
+        """Samples written but not yet played."""
+        return self.write_position - self.read_position
+
+    def audible_at(self, position: int) -> float:
+        """
+        Estimates when a sample position will be (or was) audible.
+
+        @returns float - A time.perf_counter() time
+        """
+        return time.perf_counter() + (position - self.read_position) / self.sample_rate + self.latency
+
+    def _ring_indices(self, start: int, end: int) -> np.ndarray:
+        return np.arange(start, end) % self.capacity
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Drains the jitter buffer into the device (runs on the audio thread)."""
+        out = outdata[:, 0]
+        fired = []
+        latency = self.latency
+        with self.lock:
+            available = self.write_position - self.read_position
+            count = min(available, frames)
+            start = self.read_position % self.capacity
+            first = min(count, self.capacity - start)
+            out[:first] = self.buffer[start:start + first]
+            out[first:count] = self.buffer[:count - first]
+            out[count:] = 0
+
+            # Ran dry in this block: an underrun if a write was still feeding the buffer
+            if 0 < available <= frames:
+                self.drained_at = time.perf_counter()
+                if self._pending_writes > 0:
+                    self.underruns += 1
+            elif status.output_underflow:
+                self.underruns += 1
+            self.read_position += count
+
+            # Markers whose position has now left the buffer
+            while self._markers and self._markers[0][0] <= self.read_position:
+                fired.append(self._markers.pop(0))
+            wake_writers = self._pending_writes > 0 and self._loop is not None
+
+            # Keep what was played as the echo reference
+            self.history[np.arange(self.played, self.played + frames) % len(self.history)] = out
+            self._clock.append((self.played, time.perf_counter() + latency))
+            self.played += frames
+
+        for _, callback, loop, _ in fired:
+            loop.call_soon_threadsafe(loop.call_later, latency, callback)
+        if wake_writers:
+            self._loop.call_soon_threadsafe(self._space.set)
+
+    def _fire_marker(self, marker: list):
+        """Runs a marker's callback on its loop right away."""
+        _, callback, loop, _ = marker
+        loop.call_soon_threadsafe(callback)
+
+    def add_marker(self, position: int, callback, fire_on_cut: bool = False):
+        """
+        Runs a callback on the current event loop once a sample position becomes audible.
+
+        Args:
+            position (int): Absolute sample position
+            callback: Called with no arguments
+            fire_on_cut (bool): Also run it (immediately) if the position is dropped by cut()
+        """
+        marker = [position, callback, asyncio.get_running_loop(), fire_on_cut]
+        with self.lock:
+            if position <= self.read_position:
+                self._fire_marker(marker)
+                return
+            index = next((i for i, existing in enumerate(self._markers) if existing[0] > position), len(self._markers))
+            self._markers.insert(index, marker)
+
+    async def wait_until(self, position: int):
+        """
+        Waits until a sample position has been played (or cut off).
+        """
+        done = asyncio.get_running_loop().create_future()
+        self.add_marker(position, lambda: done.done() or done.set_result(None), fire_on_cut=True)
+        await done
+
+    async def write(self, audio: np.ndarray) -> int:
+        """
+        Queues audio, waiting for space in the buffer when it is full. Stops early if cut() is called.
+
+        @returns int - The absolute position of the audio's first sample
+        """
+        audio = np.asarray(audio, dtype=np.int16).reshape(-1)
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._space = asyncio.Event()
+
+        with self.lock:
+            start_position = self.write_position
+            generation = self.generation
+            self._pending_writes += 1
+
+        offset = 0
+        try:
+            while offset < len(audio):
+                with self.lock:
+                    if self.generation != generation:
+                        break
+
+                    count = min(self.capacity - (self.write_position - self.read_position), len(audio) - offset)
+                    if count > 0:
+                        self.buffer[self._ring_indices(self.write_position, self.write_position + count)] = audio[offset:offset + count]
+                        self.write_position += count
+                        offset += count
+                        continue
+
+                    # Full: wait for the callback to make space
+                    self._space.clear()
+                await self._space.wait()
+        finally:
+            with self.lock:
+                self._pending_writes -= 1
+
+        return start_position
+
+    def cut(self, position: int = None):
+        """
+        Cuts playback off, dropping everything queued after the position (right now if None) with
+        a short fade-out, and stopping any write in progress.
+
+        @returns int - The position playback actually stops at
+        """
+        with self.lock:
+            if position is None or position < self.read_position + self.fade_samples:
+                position = self.read_position + self.fade_samples
+            position = min(position, self.write_position)
+
+            # Fade out the last samples before the cut
+            fade_start = max(position - self.fade_samples, self.read_position)
+            if position > fade_start:
+                indices = self._ring_indices(fade_start, position)
+                ramp = np.linspace(1.0, 0.0, len(indices), endpoint=False)
+                self.buffer[indices] = (self.buffer[indices] * ramp).astype(np.int16)
+
+            self.write_position = position
+            self.generation += 1
+
+            # Markers past the cut never play
+            dropped = [marker for marker in self._markers if marker[0] > position]
+            self._markers = [marker for marker in self._markers if marker[0] <= position]
+
+        for marker in dropped:
+            if marker[3]:
+                self._fire_marker(marker)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._space.set)
+        return position
+
+    def reference(self, start_time: float, n_samples: int, sample_rate: int = None) -> np.ndarray:
+        """
+        Gets the audio that was audible from a time onwards (silence where nothing was played yet or
+        it is no longer in the history), resampled for the microphone.
+
+        Args:
+            start_time (float): A time.perf_counter() time
+            n_samples (int): Samples wanted, at `sample_rate`
+            sample_rate (int): Rate to resample to (the output rate if None)
+        """
+        sample_rate = sample_rate or self.sample_rate
+        with self.lock:
+            if not self._clock:
+                return np.zeros(n_samples, dtype=np.float32)
+
+            # Map the time onto the device sample clock (extrapolating outside the recent blocks)
+            played, audible = np.array(self._clock, dtype=np.float64).T
+            if start_time < audible[0]:
+                start = played[0] - (audible[0] - start_time) * self.sample_rate
+            elif start_time > audible[-1]:
+                start = played[-1] + (start_time - audible[-1]) * self.sample_rate
+            else:
+                start = np.interp(start_time, audible, played)
+
+            positions = start + np.arange(n_samples) * (self.sample_rate / sample_rate)
+            lower = np.floor(positions).astype(np.int64)
+            valid = (lower >= max(0, self.played - len(self.history))) & (lower + 1 < self.played)
+            samples = np.zeros(n_samples, dtype=np.float32)
+            if valid.any():
+                # Linear interpolation between neighbouring samples
+                index = lower[valid]
+                fraction = (positions[valid] - index).astype(np.float32)
+                a = self.history[index % len(self.history)].astype(np.float32)
+                b = self.history[(index + 1) % len(self.history)].astype(np.float32)
+                samples[valid] = a + (b - a) * fraction
+            return samples
@@ -0,0 +1,171 @@
+"""
+Bounded conversation context for the Gemini conversation model.
+
+The conversation is kept as a list of exchanges (a user message plus everything the model and
+TARS' function calls added in reply). History is sent with every request, up to a token budget;
+once the exchanges go over it, the oldest ones are compacted into a short rolling summary that is
+sent ahead of the remaining history. The summary has its own budget and drops its oldest lines,
+so memory stays bounded however long a session runs.
+
+Token counts are estimated (about 4 characters per token) instead of asking the API, so
+compaction never adds a network round trip.
+"""
+
+import logging
+from collections import deque
+from google.genai import types
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(content: types.Content) -> int:
+    """
+    Estimates the number of tokens in a content object.
+    """
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call:
+            chars += len(part.function_call.name or "") + len(str(part.function_call.args or {}))
+        if part.function_response:
+            chars += len(part.function_response.name or "") + len(str(part.function_response.response or {}))
+    return chars // CHARS_PER_TOKEN + 1
+
+def _shorten(text: str, limit: int) -> str:
+    """Collapses whitespace and cuts text down to a limit of characters."""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+class ConversationContext:
+    """
+    Conversation history with a token budget and a rolling summary of compacted turns.
+    """
+
+    def __init__(self, token_budget: int = 4000, summary_budget: int = 400, min_exchanges: int = 2):
+        """
+        Args:
+            token_budget (int): Estimated tokens of history (summary included) sent with each request
+            summary_budget (int): Estimated tokens the rolling summary may use
+            min_exchanges (int): Most recent exchanges that are never compacted
+        """
+        self.logger = logging.getLogger('conversation_context')
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_exchanges = min_exchanges
+
+        self.exchanges: deque = deque()          # Each exchange is a list of types.Content
+        self.exchange_tokens: deque = deque()    # Estimated tokens of each exchange
+        self.summary_lines: deque = deque()      # One line per compacted exchange
+        self.summary_tokens = 0
+        self.compacted_exchanges = 0
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of the history sent with a request."""
+        return self.summary_tokens + sum(self.exchange_tokens)
+
+    def clear(self):
+        """
+        Forgets the whole conversation, summary included.
+        """
+        self.exchanges.clear()
+        self.exchange_tokens.clear()
+        self.summary_lines.clear()
+        self.summary_tokens = 0
+
+    def start_exchange(self, user_content: types.Content):
+        """
+        Starts a new exchange with the user's message, compacting older exchanges if over budget.
+        """
+        self.exchanges.append([user_content])
+        self.exchange_tokens.append(estimate_tokens(user_content))
+        self._compact()
+
+    def append(self, content: types.Content):
+        """
+        Adds a content object (model reply, function call or function response) to the current exchange.
+        """
+        if not self.exchanges:
+            raise RuntimeError("No exchange to append to; call start_exchange() first")
+
+        self.exchanges[-1].append(content)
+        self.exchange_tokens[-1] += estimate_tokens(content)
+        self._compact()
+
+    def drop_unanswered_calls(self) -> int:
+        """
+        Removes function calls at the end of the current exchange that never got a response (e.g. the
+        request was cancelled while they ran). Gemini rejects a history whose calls and responses don't pair up.
+
+        @returns int - The number of calls removed
+        """
+        if not self.exchanges or self.exchanges[-1][-1].role != "model":
+            return 0
+
+        exchange = self.exchanges[-1]
+        last = exchange[-1]
+        calls = [part for part in last.parts or [] if part.function_call is not None]
+        if not calls:
+            return 0
+
+        # Keep any text the model said alongside the calls
+        kept = [part for part in last.parts if part.function_call is None]
+        self.exchange_tokens[-1] -= estimate_tokens(last)
+        if kept:
+            exchange[-1] = types.Content(role="model", parts=kept)
+            self.exchange_tokens[-1] += estimate_tokens(exchange[-1])
+        else:
+            exchange.pop()
+        return len(calls)
+
+    def contents(self) -> list[types.Content]:
+        """
+        Gets the history to send: the rolling summary (if any), then every retained exchange.
+        """
+        contents = []
+        if self.summary_lines:
+            summary = "SUMMARY OF EARLIER CONVERSATION:\n" + "\n".join(self.summary_lines)
+            contents.append(types.Content(role="user", parts=[types.Part(text=summary)]))
+
+        for exchange in self.exchanges:
+            contents.extend(exchange)
+        return contents
+
+    def _summarize(self, exchange: list[types.Content]) -> str:
+        """
+        Condenses an exchange into one summary line.
+        """
+        said, replied, called = [], [], []
+        for content in exchange:
+            for part in content.parts or []:
+                if part.function_call:
+                    called.append(part.function_call.name)
+                elif part.text and content.role == "user":
+                    said.append(part.text)
+                elif part.text:
+                    replied.append(part.text)
+
+        line = f"- User: {_shorten(' '.join(said), 160)}"
+        if called:
+            line += f" | Functions: {', '.join(called)}"
+        if replied:
+            line += f" | TARS: {_shorten(' '.join(replied), 160)}"
+        return line
+
+    def _compact(self):
+        """
+        Moves the oldest exchanges into the summary until the history fits the budget.
+        """
+        while self.tokens > self.token_budget and len(self.exchanges) > self.min_exchanges:
+            exchange = self.exchanges.popleft()
+            self.exchange_tokens.popleft()
+            line = self._summarize(exchange)
+            self.summary_lines.append(line)
+            self.summary_tokens += len(line) // CHARS_PER_TOKEN + 1
+            self.compacted_exchanges += 1
+
+            # Keep the summary itself bounded by forgetting its oldest lines
+            while self.summary_tokens > self.summary_budget and len(self.summary_lines) > 1:
+                self.summary_tokens -= len(self.summary_lines.popleft()) // CHARS_PER_TOKEN + 1
+
+            self.logger.debug(f"Compacted an exchange into the summary ({len(self.exchanges)} exchanges, ~{self.tokens} tokens kept)")
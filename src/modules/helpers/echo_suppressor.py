@@ -0,0 +1,137 @@
+"""
+Reference-signal echo suppression for the wake word path.
+
+While TARS is talking the microphone hears its own voice, which must not wake it up. The audio
+output keeps what it played and when, so for every microphone frame the suppressor knows exactly
+what the speaker was playing. It estimates how that reference reaches the microphone (a bulk delay
+found by cross-correlation, plus a per-frequency coupling learned from the cross-spectrum) and
+attenuates each STFT bin by how much of its energy is predicted echo. The user's voice isn't
+correlated with the reference, so it passes through.
+
+This is a suppressor, not a full canceller: it trades some distortion of the user's voice while
+TARS is speaking for robustness, which is all the wake word model needs.
+"""
+
+import collections
+import numpy as np
+from modules.helpers.audio_output import AudioOutput
+
+class EchoSuppressor:
+    """
+    Removes TARS' own voice from microphone frames using the audio output as the reference.
+    """
+
+    def __init__(self, output: AudioOutput, sample_rate: int = 16_000, fft_size: int = 256, max_delay: float = 0.25,
+                 initial_delay: float = 0.05, overestimate: float = 2.0, floor: float = 0.05, smoothing: float = 0.9):
+        """
+        Args:
+            output (AudioOutput): The output whose playback is the echo reference
+            sample_rate (int): Microphone sample rate
+            fft_size (int): STFT size (50% overlap)
+            max_delay (float): Longest echo path delay searched for (seconds)
+            initial_delay (float): Echo path delay assumed until one has been measured (seconds)
+            overestimate (float): How aggressively predicted echo is removed
+            floor (float): Lowest gain applied to a bin
+            smoothing (float): Weight of the past in the coupling estimate
+        """
+        self.output = output
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.hop = fft_size // 2
+        self.window = np.sqrt(np.hanning(fft_size + 1)[:-1]).astype(np.float32) # Periodic; squares sum to 1 at 50% overlap
+        self.max_delay = max_delay
+        self.delay = initial_delay
+        self.overestimate = overestimate
+        self.floor = floor
+        self.smoothing = smoothing
+
+        bins = fft_size // 2 + 1
+        self.cross_spectrum = np.zeros(bins, dtype=np.complex64) # E[Y X*]
+        self.reference_power = np.full(bins, 1e-3, dtype=np.float32) # E[|X|^2]
+
+        # Recent microphone audio and its start time, for delay estimation
+        self.mic_history = collections.deque(maxlen=12)
+        self.frames_since_delay_update = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the STFT state (when the microphone stream jumps); the echo path estimate is kept.
+        """
+        self._input_tail = np.zeros(self.hop, dtype=np.float32)
+        self._output_tail = np.zeros(self.hop, dtype=np.float32)
+        self.mic_history.clear()
+
+    def _windows(self, samples: np.ndarray) -> np.ndarray:
+        """Splits samples into windowed STFT frames (hop = fft_size / 2)."""
+        count = (len(samples) - self.fft_size) // self.hop + 1
+        index = np.arange(self.fft_size)[None, :] + self.hop * np.arange(count)[:, None]
+        return np.fft.rfft(samples[index] * self.window, axis=1)
+
+    def _update_delay(self):
+        """
+        Measures the echo path delay by cross-correlating recent microphone audio with the reference (GCC-PHAT).
+        """
+        started_at = self.mic_history[0][0]
+        mic = np.concatenate([frame for _, frame in self.mic_history])
+        lead = int(self.max_delay * self.sample_rate)
+        reference = self.output.reference(started_at - self.max_delay, lead + len(mic), self.sample_rate)
+        if np.sqrt(np.mean(reference ** 2)) < 100: # Nothing (audible) was playing
+            return
+
+        size = 1 << int(np.ceil(np.log2(len(mic) + len(reference))))
+        spectrum = np.fft.rfft(reference, size) * np.conj(np.fft.rfft(mic, size))
+        correlation = np.fft.irfft(spectrum / (np.abs(spectrum) + 1e-9), size)
+
+        # The echo lags the reference: mic[t] ~ reference[t + lead - delay], so the peak is at lead - delay
+        lags = correlation[:lead + 1][::-1] # Delay 0 .. max_delay
+        peak = int(np.argmax(lags))
+        if lags[peak] > 4 * np.mean(np.abs(lags)):
+            self.delay = peak / self.sample_rate
+
+    def process(self, frame: np.ndarray, captured_at: float) -> np.ndarray:
+        """
+        Suppresses echo in one microphone frame. The output lags the input by fft_size / 2 samples.
+
+        Args:
+            frame (np.ndarray): int16 microphone samples
+            captured_at (float): time.perf_counter() time the frame's first sample reached the microphone
+
+        Returns:
+            np.ndarray: The cleaned int16 frame
+        """
+        mic = np.concatenate((self._input_tail, frame.astype(np.float32)))
+        self._input_tail = mic[-self.hop:]
+        self.mic_history.append((captured_at, mic[self.hop:]))
+
+        # The reference that was playing when this audio (tail included) was captured, shifted by the echo delay
+        reference = self.output.reference(captured_at - self.hop / self.sample_rate - self.delay, len(mic), self.sample_rate)
+
+        mic_spectrum = self._windows(mic)
+        if np.any(reference):
+            reference_spectrum = self._windows(reference)
+            reference_power = np.abs(reference_spectrum) ** 2
+
+            # Learn the coupling only while there is a reference to learn it from
+            self.cross_spectrum = self.smoothing * self.cross_spectrum + (1 - self.smoothing) * np.mean(mic_spectrum * np.conj(reference_spectrum), axis=0)
+            self.reference_power = self.smoothing * self.reference_power + (1 - self.smoothing) * np.mean(reference_power, axis=0)
+            coupling = np.abs(self.cross_spectrum) ** 2 / self.reference_power ** 2
+
+            # Attenuate each bin by its share of predicted echo
+            echo = coupling * reference_power
+            gain = np.clip(1 - self.overestimate * echo / (np.abs(mic_spectrum) ** 2 + 1e-9), self.floor, 1.0)
+            mic_spectrum = mic_spectrum * gain
+
+            self.frames_since_delay_update += 1
+            if self.frames_since_delay_update >= 6 and len(self.mic_history) == self.mic_history.maxlen:
+                self.frames_since_delay_update = 0
+                self._update_delay()
+
+        # Overlap-add back to samples
+        cleaned = np.zeros(len(mic), dtype=np.float32)
+        cleaned[:self.hop] = self._output_tail
+        for i, window in enumerate(np.fft.irfft(mic_spectrum, self.fft_size, axis=1) * self.window):
+            cleaned[i * self.hop:i * self.hop + self.fft_size] += window
+        self._output_tail = cleaned[len(frame):]
+
+        return np.clip(cleaned[:len(frame)], -32768, 32767).astype(np.int16)
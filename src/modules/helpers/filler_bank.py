@@ -0,0 +1,113 @@
+"""
+Bank of short acknowledgement phrases ("Processing.", "One moment.") that TARS plays as soon as a
+command ends, to cover the silence while Gemini and TTS work on the real reply.
+
+The phrases are synthesized once (through the TTS cache, so only the very first boot calls the
+API) and kept in memory. When the real reply is ready the filler is cut off on the output stream
+at the next pause between words, so it never stops mid-syllable.
+"""
+
+import asyncio, logging, random, time
+import numpy as np
+from modules.models.filler_policy import FillerPolicy
+from modules.models.personality_parameters import PersonalityParameters
+
+SAMPLE_RATE = 24_000 # OpenAI TTS PCM output
+
+# Phrases for each humor level (the higher set is used once humor reaches its threshold)
+FILLER_PHRASES = {
+    0.0: ["Processing.", "One moment.", "Stand by.", "Working on it."],
+    0.6: ["Processing. Try to contain your excitement.", "One moment. I'm thinking, which is more than most.", "Calculating. Please remain calm.", "Stand by. Genius takes a second."],
+}
+
+CUT_WINDOW = 0.02      # Seconds per energy window when looking for pauses
+CUT_MAX_WAIT = 0.3     # Longest a stop waits for a pause before cutting anyway (seconds)
+
+class FillerBank:
+    """
+    Pre-synthesized acknowledgement fillers, played while a reply is on its way.
+    """
+
+    def __init__(self, tts_controller, policy: FillerPolicy = None):
+        self.logger = logging.getLogger('filler_bank')
+        self.tts_controller = tts_controller
+        self.policy = policy or FillerPolicy()
+        self.expected_latency = self.policy.initial_latency
+
+        self.fillers: dict[float, list[tuple[str, np.ndarray, np.ndarray]]] = {} # Humor level -> (phrase, samples, pause positions)
+        self._playing: asyncio.Task = None
+        self._pauses: np.ndarray = None # Pause positions of the filler playing
+        self._start_position = 0 # Output position the filler playing starts at
+        self._last_phrase = None
+
+    @staticmethod
+    def _find_pauses(audio: np.ndarray) -> np.ndarray:
+        """
+        Finds the quiet points between words, where a filler can be cut off cleanly.
+
+        @returns np.ndarray - Sample positions of the quiet windows
+        """
+        window = int(CUT_WINDOW * SAMPLE_RATE)
+        frames = audio[:len(audio) // window * window].astype(np.float32).reshape(-1, window)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        if len(rms) == 0:
+            return np.array([len(audio)])
+        quiet = np.flatnonzero(rms < 0.1 * rms.max()) * window
+        return np.append(quiet, len(audio))
+
+    async def load(self):
+        """
+        Synthesizes every filler phrase (from the TTS cache after the first boot) into memory.
+        """
+        started = time.perf_counter()
+        for humor, phrases in FILLER_PHRASES.items():
+            audio = await asyncio.gather(*(self.tts_controller.synthesize(phrase) for phrase in phrases))
+            # Copy out of the cache's memory maps so playback never touches the disk
+            self.fillers[humor] = [(phrase, np.array(samples), self._find_pauses(samples)) for phrase, samples in zip(phrases, audio)]
+
+        count = sum(len(fillers) for fillers in self.fillers.values())
+        self.logger.info(f"Loaded {count} fillers in {time.perf_counter() - started:.2f}s (policy: {self.policy})")
+
+    def record_latency(self, latency: float):
+        """
+        Updates the expected reply latency with a measurement (from the end of a command to its first reply audio).
+        """
+        self.expected_latency += self.policy.smoothing * (latency - self.expected_latency)
+
+    def start(self, personality_parameters: PersonalityParameters = None) -> bool:
+        """
+        Starts playing a filler if the policy calls for one.
+
+        @returns bool - Whether a filler started
+        """
+        if not self.fillers or self._playing is not None or not self.policy.should_play(self.expected_latency):
+            return False
+
+        # Pick from the funniest set the humor setting allows, never the same phrase twice in a row
+        humor = personality_parameters.humor if personality_parameters is not None else 0.0
+        level = max(level for level in self.fillers if level <= humor)
+        choices = [filler for filler in self.fillers[level] if filler[0] != self._last_phrase] or self.fillers[level]
+        phrase, audio, pauses = random.choice(choices)
+        self._last_phrase = phrase
+
+        self._pauses = pauses
+        self._start_position = self.tts_controller.output.write_position
+        self._playing = asyncio.create_task(self.tts_controller.play(audio))
+        self.logger.debug(f"Filler: '{phrase}' (expected latency {self.expected_latency:.2f}s)")
+        return True
+
+    async def stop(self):
+        """
+        Cuts the filler off at its next pause between words (or after CUT_MAX_WAIT) and waits for it to end.
+        """
+        if self._playing is None:
+            return
+
+        playing, self._playing = self._playing, None
+        output = self.tts_controller.output
+        position = output.read_position - self._start_position
+        upcoming = self._pauses[self._pauses >= position]
+        cut = upcoming[0] if len(upcoming) else position
+        output.cut(self._start_position + int(min(cut, position + CUT_MAX_WAIT * SAMPLE_RATE)))
+
+        await playing
@@ -0,0 +1,113 @@
+"""
+On-device intent matcher for commands that map straight onto a TARS function call.
+
+The vosk transcript is normalized (lowercase, no punctuation, no "hey tars"/"please") and has to
+match one of the patterns below in full; anything else, including a known command with extra
+words around it, falls through to Gemini. Numbers can be digits or spoken words ("five",
+"eighty five"), since vosk transcribes them as words.
+"""
+
+import logging, re, time
+from dataclasses import fields
+from google.genai import types
+from modules.models.intent_stats import IntentStats
+from modules.models.personality_parameters import PersonalityParameters
+
+UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19, "a": 1, "an": 1,
+}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+
+# A number as digits or words (up to "one hundred")
+NUMBER = r"(?:\d+(?:\.\d+)?|(?:(?:a|one) hundred)|(?:(?:" + "|".join(TENS) + r")(?: (?:" + "|".join(u for u in UNITS if u not in ("a", "an", "zero")) + r"))?)|(?:" + "|".join(UNITS) + r"))"
+
+PERSONALITY_PARAMETERS = "|".join(field.name for field in fields(PersonalityParameters))
+
+def parse_number(text: str) -> float:
+    """
+    Parses a number written as digits or words (e.g. "85", "eighty five", "a hundred").
+    """
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    total = 0
+    for word in text.split():
+        if word == "hundred":
+            total = max(total, 1) * 100
+        elif word in TENS:
+            total += TENS[word]
+        else:
+            total += UNITS[word]
+    return float(total)
+
+def _walk(match: re.Match) -> dict:
+    direction = "backward" if match["direction"].startswith("back") else "forward"
+    steps = int(parse_number(match["steps"])) if match["steps"] else 5
+    return {"direction": direction, "steps": steps}
+
+def _update_personality(match: re.Match) -> dict:
+    value = parse_number(match["value"])
+    # "80 percent", "80" and "0.8" all mean 0.8
+    if match["percent"] or value > 1:
+        value /= 100
+    return {"parameter": match["parameter"], "value": min(max(value, 0.0), 1.0)}
+
+# (function name, full-match pattern, argument builder)
+INTENTS = [
+    ("walk", re.compile(rf"(?:walk|go|move|step) (?P<direction>forwards?|backwards?|back)(?: (?P<steps>{NUMBER}) steps?)?"), _walk),
+    ("walk", re.compile(rf"(?:walk|go|move|take) (?P<steps>{NUMBER}) steps? (?P<direction>forwards?|backwards?|back)"), _walk),
+    ("update_personality", re.compile(rf"(?:set|change|adjust|put) (?:your )?(?P<parameter>{PERSONALITY_PARAMETERS})(?: setting| level)? (?:to|at) (?P<value>{NUMBER})(?P<percent> percent)?"), _update_personality),
+    ("clear_conversation", re.compile(r"(?:clear|reset|wipe|erase|forget) (?:the |our |this |your )?(?:conversation|chat|memory|history)(?: history)?"), lambda match: {}),
+    ("wave", re.compile(r"wave(?: (?:at|to) (?:me|us|everyone)| hello| hi)?"), lambda match: {}),
+    ("stop", re.compile(r"(?:stop|halt|freeze)(?: (?:walking|running|moving))?"), lambda match: {}),
+]
+
+FILLER = re.compile(r"^(?:hey )?tars |^please |^can you |^could you | please$| tars$")
+
+def normalize(transcript: str) -> str:
+    """
+    Normalizes a transcript for matching.
+    """
+    text = re.sub(r"[^a-z0-9.%' ]+", " ", transcript.lower()).replace("%", " percent")
+    text = " ".join(text.replace("'", "").split()).strip(" .")
+
+    # Strip polite/addressing words from the ends until none are left
+    while (stripped := FILLER.sub("", text)) != text:
+        text = stripped
+    return text
+
+class IntentMatcher:
+    """
+    Matches transcripts of known commands to function calls without a round trip to Gemini.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('intent_matcher')
+        self.stats = IntentStats()
+
+    def match(self, transcript: str) -> types.FunctionCall:
+        """
+        Matches a transcript against the known commands.
+
+        @returns types.FunctionCall - The function call to perform, or None if the transcript should go to Gemini
+        """
+        started = time.perf_counter()
+        text = normalize(transcript)
+
+        for name, pattern, build_args in INTENTS:
+            match = pattern.fullmatch(text)
+            if match is None:
+                continue
+
+            function_call = types.FunctionCall(name=name, args=build_args(match))
+            self.stats.record_hit(time.perf_counter() - started)
+            self.logger.info(f"Local intent: '{text}' -> {name}({function_call.args})")
+            return function_call
+
+        self.stats.record_miss(time.perf_counter() - started)
+        return None
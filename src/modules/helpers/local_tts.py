@@ -0,0 +1,125 @@
+"""
+On-device speech synthesis with pyttsx3, off the event loop.
+
+pyttsx3 blocks for the whole utterance and must be driven from the thread that created its
+engine, so the engine lives on a dedicated worker thread fed by a queue. It is only created
+when the first utterance is requested, so online runs never pay its startup time.
+
+Speech is rendered to a WAV file and converted to the same 24 kHz int16 PCM the cloud backends
+produce, so local audio goes through the same cache and the same output stream.
+"""
+
+import asyncio, logging, os, queue, tempfile, threading, time, wave
+import numpy as np
+import pyttsx3 as tts
+
+SAMPLE_RATE = 24_000 # OpenAI TTS PCM output; local speech is resampled to match
+
+def read_wav(path: str) -> np.ndarray:
+    """
+    Reads a WAV file as 24 kHz int16 mono samples.
+    """
+    with wave.open(path, "rb") as wav:
+        rate, channels, width = wav.getframerate(), wav.getnchannels(), wav.getsampwidth()
+        frames = wav.readframes(wav.getnframes())
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    audio = np.frombuffer(frames, dtype=dtype).reshape(-1, channels).mean(axis=1)
+    if width == 1:
+        audio = (audio - 128) * 256
+    elif width == 4:
+        audio = audio / 65536
+
+    if rate != SAMPLE_RATE and len(audio) > 0:
+        audio = np.interp(np.arange(int(len(audio) * SAMPLE_RATE / rate)) * rate / SAMPLE_RATE, np.arange(len(audio)), audio)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+class LocalTtsEngine:
+    """
+    pyttsx3 on its own worker thread, started on first use.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('local_tts')
+        self.jobs: queue.Queue = queue.Queue() # (text, future) per utterance, then None to stop
+        self._thread: threading.Thread = None
+        self._start_lock = threading.Lock()
+        self.error: Exception = None # Why the engine couldn't be created, if it couldn't
+
+    @property
+    def started(self) -> bool:
+        """Whether the worker (and so the engine) has been started."""
+        return self._thread is not None
+
+    def _ensure_started(self):
+        """Starts the worker thread the first time speech is requested."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="local_tts", daemon=True)
+                self._thread.start()
+
+    def _work(self):
+        """Creates the engine, then renders queued utterances one at a time (runs on the worker thread)."""
+        started = time.perf_counter()
+        try:
+            engine = tts.init()
+        except Exception as e:
+            self.logger.error(f"Local TTS engine failed to start: {e}")
+            self.error = e
+
+            # Fail every utterance, queued now or later, instead of leaving its caller waiting forever
+            while (job := self.jobs.get()) is not None:
+                _, future = job
+                future.get_loop().call_soon_threadsafe(self._settle, future, None, e)
+            return
+        self.logger.info(f"Local TTS engine started in {time.perf_counter() - started:.2f}s.")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "speech.wav")
+            while (job := self.jobs.get()) is not None:
+                text, future = job
+
+                # Cancelled while it was queued: skip it
+                if future.cancelled():
+                    continue
+
+                try:
+                    engine.save_to_file(text, path)
+                    engine.runAndWait()
+                    result = read_wav(path)
+                except Exception as e:
+                    future.get_loop().call_soon_threadsafe(self._settle, future, None, e)
+                    continue
+                future.get_loop().call_soon_threadsafe(self._settle, future, result, None)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, result: np.ndarray, error: Exception):
+        """Hands a rendered utterance (or its error) back on the event loop, unless it was cancelled meanwhile."""
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def synthesize(self, text: str) -> np.ndarray:
+        """
+        Renders speech on the worker. Cancelling skips the utterance if it hasn't started yet (one
+        already rendering finishes and is thrown away).
+
+        @returns np.ndarray - 24 kHz int16 mono samples
+        @raises Exception - If the engine couldn't be created
+        """
+        if self.error is not None:
+            raise self.error
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.jobs.put((text, future))
+        return await future
+
+    def close(self):
+        """
+        Stops the worker once it has finished the utterance it is on.
+        """
+        if self._thread is not None:
+            self.jobs.put(None)
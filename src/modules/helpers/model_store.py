@@ -0,0 +1,176 @@
+"""
+Local model store for TARS.
+
+Every model TARS loads at startup is listed in `model_manifest.json` at the root of the repo, with
+its path (relative to the repo root, not the working directory), size and SHA-256 content hash.
+Startup only does a fast existence/size check; full hash verification is available on demand.
+
+openWakeWord's shared feature models (melspectrogram and embedding) live inside the installed
+package. They are checked for on disk and only downloaded if actually missing, instead of calling
+oww.utils.download_models() (which fetches every pretrained model) on every boot.
+
+To refresh the manifest after adding or retraining a model, run (from the repo root):
+    python src/modules/helpers/model_store.py --update
+To verify every hash:
+    python src/modules/helpers/model_store.py --verify
+"""
+
+import hashlib, json, logging, os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+MANIFEST_PATH = REPO_ROOT / "model_manifest.json"
+
+# Models tracked by the manifest: name -> path relative to the repo root
+TRACKED_MODELS = {
+    "hey_tars.onnx": "activation_model/hey_tars.onnx",
+    "hey_tars.tflite": "activation_model/hey_tars.tflite",
+    "hey_tars_float16.tflite": "activation_model/hey_tars_float16.tflite",
+    "riley_model.pkl": "activation_model/training/riley_model.pkl",
+    "vosk": "model",
+}
+
+# Speaker verifiers (activation_model/training/<speaker>_model.pkl) are tracked automatically
+VERIFIER_DIR = "activation_model/training"
+VERIFIER_SUFFIX = "_model.pkl"
+
+# openWakeWord feature model files needed for each inference framework
+FEATURE_MODEL_FILES = ("melspectrogram", "embedding_model")
+
+def file_sha256(path: Path) -> str:
+    """
+    Gets the SHA-256 hash of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelStore:
+    """
+    Resolves model paths from the manifest and checks they are present.
+    """
+
+    def __init__(self, root: Path = REPO_ROOT, manifest_path: Path = MANIFEST_PATH):
+        self.logger = logging.getLogger('model_store')
+        self.root = Path(root)
+
+        with open(manifest_path, "r") as f:
+            self.manifest: dict = json.load(f)["models"]
+
+    def path(self, name: str) -> str:
+        """
+        Gets the absolute path of a model, checking (without hashing) that it is present.
+
+        Raises:
+            KeyError: If the model isn't in the manifest
+            FileNotFoundError: If the model is missing or has the wrong size
+        """
+        entry = self.manifest[name]
+        path = self.root / entry["path"]
+
+        if entry.get("directory", False):
+            if not path.is_dir():
+                raise FileNotFoundError(f"Model '{name}' directory not found at '{path}'")
+        elif not path.is_file():
+            raise FileNotFoundError(f"Model '{name}' not found at '{path}'")
+        elif path.stat().st_size != entry["size"]:
+            raise FileNotFoundError(f"Model '{name}' at '{path}' is {path.stat().st_size} bytes, expected {entry['size']} (run with --update if it was retrained)")
+
+        return str(path)
+
+    def verifiers(self) -> dict:
+        """
+        Gets every speaker verifier in the manifest.
+
+        Returns:
+            dict: Speaker name -> absolute path of the speaker's verifier
+        """
+        return {name[:-len(VERIFIER_SUFFIX)]: self.path(name) for name in self.manifest if name.endswith(VERIFIER_SUFFIX)}
+
+    def verify(self) -> list[str]:
+        """
+        Checks every model's content hash against the manifest.
+
+        Returns:
+            list[str]: Names of models that are missing or don't match
+        """
+        failed = []
+        for name, entry in self.manifest.items():
+            try:
+                path = self.path(name)
+            except FileNotFoundError as e:
+                self.logger.error(e)
+                failed.append(name)
+                continue
+
+            if "sha256" in entry and file_sha256(Path(path)) != entry["sha256"]:
+                self.logger.error(f"Model '{name}' at '{path}' does not match its manifest hash.")
+                failed.append(name)
+
+        return failed
+
+    def ensure_feature_models(self, inference_framework: str = "onnx", allow_download: bool = True):
+        """
+        Makes sure openWakeWord's melspectrogram and embedding models are installed. Only touches
+        the network if one is missing and allow_download is set.
+
+        Raises:
+            FileNotFoundError: If a feature model is missing and can't be downloaded
+        """
+        import openwakeword as oww
+
+        target_dir = Path(oww.__file__).parent / "resources" / "models"
+        extension = ".onnx" if inference_framework == "onnx" else ".tflite"
+        missing = [name + extension for name in FEATURE_MODEL_FILES if not (target_dir / (name + extension)).is_file()]
+        if not missing:
+            return
+
+        if not allow_download:
+            raise FileNotFoundError(f"openWakeWord feature models missing from '{target_dir}': {', '.join(missing)}")
+
+        self.logger.warning(f"Downloading missing openWakeWord feature models: {', '.join(missing)}")
+        target_dir.mkdir(parents=True, exist_ok=True)
+        release_url = os.path.dirname(oww.FEATURE_MODELS["embedding"]["download_url"])
+        for filename in missing:
+            oww.utils.download_file(f"{release_url}/{filename}", str(target_dir))
+
+def write_manifest(root: Path = REPO_ROOT, manifest_path: Path = MANIFEST_PATH):
+    """
+    Regenerates the manifest from the models currently on disk.
+    """
+    tracked = dict(TRACKED_MODELS)
+    for path in sorted((root / VERIFIER_DIR).glob("*" + VERIFIER_SUFFIX)):
+        tracked[path.name] = f"{VERIFIER_DIR}/{path.name}"
+
+    models = {}
+    for name, relative_path in tracked.items():
+        path = root / relative_path
+        if path.is_dir():
+            # Directories (the vosk model) are only checked for existence
+            models[name] = {"path": relative_path, "directory": True}
+        else:
+            models[name] = {"path": relative_path, "size": path.stat().st_size, "sha256": file_sha256(path)}
+
+    with open(manifest_path, "w") as f:
+        json.dump({"models": models}, f, indent=4)
+        f.write("\n")
+
+if __name__ == "__main__":
+    import argparse, sys
+
+    parser = argparse.ArgumentParser(description="Manage the TARS model manifest.")
+    parser.add_argument("--update", action="store_true", help="Regenerate the manifest from the models on disk")
+    parser.add_argument("--verify", action="store_true", help="Verify every model's content hash")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(name)s - %(message)s')
+
+    if args.update:
+        write_manifest()
+        print(f"Wrote {MANIFEST_PATH}")
+    if args.verify:
+        failed = ModelStore().verify()
+        print("All models verified." if not failed else f"Failed: {', '.join(failed)}")
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,64 @@
+"""
+Splits streamed LLM text into sentences as they complete, so each one can be spoken (and shown)
+while the rest of the reply is still being generated.
+"""
+
+import re
+
+# End of a sentence: terminal punctuation (plus any closing quotes/brackets) followed by whitespace,
+# or a line break
+SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*\s+|\n+""")
+
+# Text ending in an abbreviation (as a whole word) whose trailing period doesn't end a sentence
+ABBREVIATION = re.compile(r"(?:^|[\s(])(?:mr|mrs|ms|dr|st|vs|e\.g|i\.e|etc|approx)\.$", re.IGNORECASE)
+
+# "No." only abbreviates "number" when a digit follows it ("No. 5"); otherwise it is the word "no"
+NUMBER_ABBREVIATION = re.compile(r"(?:^|[\s(])no\.$", re.IGNORECASE)
+
+class SentenceSegmenter:
+    """
+    Buffers streamed text and hands out complete sentences.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        """
+        Args:
+            min_chars (int): Sentences shorter than this are joined onto the next one (so "Yes." isn't its own TTS request)
+        """
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        """
+        Adds streamed text.
+
+        @returns list[str] - Every sentence completed by the new text
+        """
+        self.buffer += text
+        segments = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+
+            # Not a real boundary, or too short to be worth its own segment yet (a "No." at the end of the
+            # buffer waits for the next text to tell whether a number follows)
+            following = self.buffer[match.end():match.end() + 1]
+            if (ABBREVIATION.search(candidate) or (NUMBER_ABBREVIATION.search(candidate) and (not following or following.isdigit()))
+                    or len(candidate) < self.min_chars):
+                continue
+
+            segments.append(candidate)
+            start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return segments
+
+    def flush(self) -> str:
+        """
+        Gets whatever text is left once the stream ends.
+
+        @returns str - The remaining text, or None if there is none
+        """
+        remaining = self.buffer.strip()
+        self.buffer = ""
+        return remaining or None
@@ -0,0 +1,122 @@
+"""
+Pipelined TTS: a reply is synthesized segment by segment, with up to N synthesis requests in
+flight ahead of the player, and every segment is written back-to-back to the controller's
+output stream so there are no gaps between them. Audio streamed from a cloud backend is written
+chunk by chunk as it arrives, so a segment starts playing before it has been fully synthesized.
+
+Segments can be added while the reply is still being generated (e.g. sentence by sentence from
+a streaming LLM response); call finish() once the last one has been added. Each segment can
+carry a callback that runs the moment its audio becomes audible, so text shown alongside the
+speech stays in step with it.
+"""
+
+import asyncio, logging, time
+from typing import Awaitable, Callable
+import numpy as np
+from modules.models.personality_parameters import PersonalityParameters
+from modules.models.speech_pipeline_stats import SpeechPipelineStats
+
+class SpeechPipeline:
+    """
+    Synthesizes reply segments ahead of playback and plays them gaplessly.
+    """
+
+    def __init__(self, tts_controller, personality_parameters: PersonalityParameters = None, max_in_flight: int = 3):
+        self.logger = logging.getLogger('speech_pipeline')
+        self.tts_controller = tts_controller
+        self.personality_parameters = personality_parameters
+        self.slots = asyncio.Semaphore(max_in_flight)
+
+        self.segments: asyncio.Queue = asyncio.Queue() # (synthesis task, audio chunks, on_start) in reply order, then None
+        self.tasks: list[asyncio.Task] = []
+        self.stats = SpeechPipelineStats()
+        self._first_queued_at = None
+
+    async def _synthesize(self, text: str, chunks: asyncio.Queue) -> np.ndarray:
+        """Synthesizes a segment once an in-flight slot is free, putting its audio into `chunks` as it arrives (then None)."""
+        try:
+            async with self.slots:
+                return await self.tts_controller.synthesize(text, self.personality_parameters, on_chunk=chunks.put_nowait)
+        finally:
+            chunks.put_nowait(None)
+
+    def add(self, text: str, on_start: Callable[[], None] = None):
+        """
+        Queues a segment; its synthesis starts as soon as fewer than `max_in_flight` are running.
+        
+        @param on_start - Called the moment the segment's audio becomes audible (e.g. to show its text)
+        """
+        if self._first_queued_at is None:
+            self._first_queued_at = time.perf_counter()
+
+        chunks = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize(text, chunks))
+        self.tasks.append(task)
+        self.segments.put_nowait((task, chunks, on_start))
+        self.stats.segments += 1
+
+    def finish(self):
+        """
+        Marks the end of the reply; play() returns once everything queued has played.
+        """
+        self.segments.put_nowait(None)
+
+    def cancel(self):
+        """
+        Cancels every synthesis that hasn't finished yet.
+        """
+        for task in self.tasks:
+            task.cancel()
+
+    async def play(self, on_first_audio: Callable[[], Awaitable] = None) -> SpeechPipelineStats:
+        """
+        Writes each segment to the output stream as it becomes ready, until finish() has been called
+        and everything has played. Cancelling it cuts the reply off.
+
+        @param on_first_audio - Awaited right before the first audio plays (e.g. to cut off a filler)
+        @returns SpeechPipelineStats - Time to first audio, underruns and so on
+        """
+        output = self.tts_controller.output
+        end = None # Output position the reply ends at so far
+        try:
+            while (segment := await self.segments.get()) is not None:
+                task, chunks, on_start = segment
+                started = False
+                
+                # Write the segment's audio as it streams in
+                while (chunk := await chunks.get()) is not None:
+                    if len(chunk) == 0:
+                        continue
+                    
+                    if not started:
+                        started = True
+                        if end is None:
+                            if on_first_audio is not None:
+                                await on_first_audio()
+                            self.stats.time_to_first_audio = time.perf_counter() - self._first_queued_at
+                        elif output.read_position >= end:
+                            # The output ran dry before this segment was ready
+                            self.stats.underruns += 1
+                            if output.drained_at is not None:
+                                self.stats.underrun_time += time.perf_counter() - output.drained_at
+                        if on_start is not None:
+                            output.add_marker(output.write_position, on_start)
+                    
+                    end = await output.write(chunk) + len(chunk)
+                    self.stats.audio_seconds += len(chunk) / output.sample_rate
+                
+                try:
+                    await task
+                except Exception as e:
+                    self.logger.error(f"Segment failed to synthesize{' partway through' if started else ''}: {e}")
+
+            if end is not None:
+                await output.wait_until(end)
+        except asyncio.CancelledError:
+            output.cut()
+            raise
+        finally:
+            self.cancel()
+
+        self.logger.info(f"TTS pipeline: {self.stats}")
+        return self.stats
@@ -0,0 +1,226 @@
+"""
+Registry of the functions TARS exposes to Gemini.
+
+Handlers are declared once with the @tool decorator. The Gemini function declarations are generated
+from the handler signatures (annotations give the types, typing.Literal gives an enum, and
+parameters without a default are required). The decorator also says where the handler runs:
+inline on the event loop, on a worker thread, or as a cancellable background task.
+
+Background handlers may take a `stop_event` (threading.Event) argument; it is set when the task is
+cancelled, so long-running work (e.g. a walk sequence) can stop between steps.
+"""
+
+import asyncio, inspect, logging, threading, typing
+from modules.models.tool import Tool, ToolMode
+
+STOP_EVENT_PARAMETER = "stop_event"
+
+SCHEMA_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+def tool(description: str, mode: ToolMode = ToolMode.INLINE, name: str = None, group: str = None, parameters: dict = None):
+    """
+    Marks a method as a tool. The registry picks it up with ToolRegistry.register_object().
+
+    Args:
+        description (str): What the tool does (sent to Gemini)
+        mode (ToolMode): Where the handler runs
+        name (str): Function name sent to Gemini (defaults to the handler's name)
+        group (str): Tools in the same group run one at a time, in the order they were called
+        parameters (dict): Parameter name -> description (sent to Gemini)
+    """
+    def decorator(handler):
+        handler._tool = Tool(
+            name=name or handler.__name__,
+            description=description,
+            handler=handler,
+            mode=mode,
+            group=group,
+            parameters=parameters or {})
+        return handler
+    return decorator
+
+class ToolRegistry:
+    """
+    Dispatches function calls to their tool handlers.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('tool_registry')
+        self.tools: dict[str, Tool] = {}
+        self.group_turns: dict[str, asyncio.Future] = {} # Group -> the turn of its most recent call
+        self.background: dict[asyncio.Task, tuple[Tool, threading.Event]] = {}
+
+    def register(self, tool: Tool):
+        """
+        Registers a tool.
+        """
+        if tool.name in self.tools:
+            raise ValueError(f"Tool '{tool.name}' is already registered")
+
+        self.tools[tool.name] = tool
+
+    def register_object(self, obj):
+        """
+        Registers every method of an object marked with @tool, bound to the object.
+        """
+        # Look the handlers up on the class, so properties on the object aren't evaluated
+        for attribute, member in inspect.getmembers(type(obj), inspect.isfunction):
+            declared: Tool = getattr(member, "_tool", None)
+            if declared is not None:
+                self.register(Tool(
+                    name=declared.name,
+                    description=declared.description,
+                    handler=getattr(obj, attribute),
+                    mode=declared.mode,
+                    group=declared.group,
+                    parameters=declared.parameters))
+
+        self.logger.info(f"Registered tools: {', '.join(str(tool) for tool in self.tools.values())}")
+
+    @staticmethod
+    def _schema(annotation) -> dict:
+        """Gets the JSON schema of a parameter annotation."""
+        if typing.get_origin(annotation) is typing.Literal:
+            return {"type": "string", "enum": [str(value) for value in typing.get_args(annotation)]}
+        return {"type": SCHEMA_TYPES.get(annotation, "string")}
+
+    def declaration(self, tool: Tool) -> dict:
+        """
+        Generates the Gemini function declaration of a tool from its handler's signature.
+        """
+        properties = {}
+        required = []
+        for parameter in inspect.signature(tool.handler).parameters.values():
+            if parameter.name == STOP_EVENT_PARAMETER:
+                continue
+
+            schema = self._schema(parameter.annotation)
+            if parameter.name in tool.parameters:
+                schema["description"] = tool.parameters[parameter.name]
+            properties[parameter.name] = schema
+            if parameter.default is inspect.Parameter.empty:
+                required.append(parameter.name)
+
+        declaration = {"name": tool.name, "description": tool.description, "parameters": {"type": "object"}}
+        if properties:
+            declaration["parameters"]["properties"] = properties
+        if required:
+            declaration["parameters"]["required"] = required
+        return declaration
+
+    def declarations(self) -> list[dict]:
+        """
+        Generates the Gemini function declarations of every tool.
+        """
+        return [self.declaration(tool) for tool in self.tools.values()]
+
+    def _arguments(self, tool: Tool, args: dict) -> dict:
+        """
+        Gets the keyword arguments for a handler, dropping unknown ones and converting numbers
+        (Gemini sends every number as a float) to the annotated type.
+        """
+        parameters = inspect.signature(tool.handler).parameters
+        arguments = {}
+        for key, value in (args or {}).items():
+            parameter = parameters.get(key)
+            if parameter is None or key == STOP_EVENT_PARAMETER:
+                self.logger.warning(f"Ignoring unknown argument '{key}' for tool '{tool.name}'")
+                continue
+            if parameter.annotation in (int, float) and isinstance(value, (int, float)):
+                value = parameter.annotation(value)
+            arguments[key] = value
+        return arguments
+
+    def _take_turn(self, group: str) -> tuple[asyncio.Future, asyncio.Future]:
+        """
+        Queues a call behind every earlier call in its group. This must run before the caller's first
+        await, so turns follow the order calls were made in, not the order their tasks get scheduled.
+
+        @returns tuple - (the previous call's turn or None, this call's turn)
+        """
+        previous = self.group_turns.get(group)
+        turn = asyncio.get_running_loop().create_future()
+        self.group_turns[group] = turn
+        return previous, turn
+
+    @staticmethod
+    def _end_turn(turn: asyncio.Future, *waiting_on: asyncio.Future):
+        """Ends a turn once everything it is waiting on is done, so a cancelled caller never lets the next call in early."""
+        waiting_on = [future for future in waiting_on if future is not None and not future.done()]
+        if waiting_on:
+            waiting_on[0].add_done_callback(lambda _: ToolRegistry._end_turn(turn, *waiting_on[1:]))
+        elif not turn.done():
+            turn.set_result(None)
+
+    async def _run(self, tool: Tool, arguments: dict, turn: tuple = None, stop_event: threading.Event = None):
+        """Runs a handler where its mode says, once the earlier calls in its group have finished."""
+        if STOP_EVENT_PARAMETER in inspect.signature(tool.handler).parameters:
+            arguments[STOP_EVENT_PARAMETER] = stop_event or threading.Event()
+
+        previous, own_turn = turn or (None, None)
+        work = None
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            if stop_event is not None and stop_event.is_set(): # Cancelled while waiting for its turn
+                return None
+
+            if tool.mode == ToolMode.INLINE:
+                result = tool.handler(**arguments)
+                if not inspect.isawaitable(result):
+                    return result
+                work = asyncio.ensure_future(result)
+                return await work
+
+            # A worker thread can't be stopped, so the turn lasts until it finishes even if the caller is cancelled
+            work = asyncio.ensure_future(asyncio.to_thread(tool.handler, **arguments))
+            return await asyncio.shield(work)
+        finally:
+            if own_turn is not None:
+                self._end_turn(own_turn, previous, work)
+
+    async def call(self, name: str, args: dict = None):
+        """
+        Calls a tool.
+
+        @returns The handler's result, or an acknowledgement for background tools
+        @raises KeyError - If there is no tool with that name
+        """
+        tool = self.tools[name]
+        arguments = self._arguments(tool, args)
+        turn = self._take_turn(tool.group) if tool.group is not None else None
+
+        if tool.mode != ToolMode.BACKGROUND:
+            return await self._run(tool, arguments, turn)
+
+        # Background: start it and return straight away
+        stop_event = threading.Event()
+        task = asyncio.create_task(self._run(tool, arguments, turn, stop_event))
+        self.background[task] = (tool, stop_event)
+        task.add_done_callback(self._background_done)
+        return f"Started {tool.name}."
+
+    def _background_done(self, task: asyncio.Task):
+        """Logs a finished background task and forgets it."""
+        tool, stop_event = self.background.pop(task)
+        if task.cancelled() or stop_event.is_set():
+            self.logger.info(f"Background tool '{tool.name}' cancelled.")
+        elif task.exception() is not None:
+            self.logger.error(f"Background tool '{tool.name}' failed: {task.exception()}")
+        else:
+            self.logger.info(f"Background tool '{tool.name}' finished: {task.result()}")
+
+    def cancel(self, group: str = None) -> int:
+        """
+        Cancels running and queued background tools (only the ones in a group, if given).
+
+        @returns int - The number of tools cancelled
+        """
+        cancelled = 0
+        for tool, stop_event in list(self.background.values()):
+            if (group is None or tool.group == group) and not stop_event.is_set():
+                # Queued tools skip their turn; running ones stop at their next step. The task isn't
+                # cancelled outright, so the group's next call waits until the worker thread has really stopped.
+                stop_event.set()
+                cancelled += 1
+        return cancelled
@@ -0,0 +1,105 @@
+"""
+Persistent, content-addressed cache of synthesized speech.
+
+Every utterance is stored as raw 24 kHz 16-bit mono PCM under the SHA-256 of everything that
+affects how it sounds (text, voice, model, instructions and format), so a repeated utterance
+(e.g. "I am now online." at every boot) never goes back to the API. Cached audio is read through
+a memory-mapped file, so a hit is ready to play without copying it into memory first.
+
+The cache is bounded in bytes; the least recently used entries (by file modification time, which
+is refreshed on every hit) are evicted first.
+"""
+
+import hashlib, json, logging, mmap, os, tempfile, threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_CACHE_DIR = REPO_ROOT / ".tts_cache"
+EXTENSION = ".pcm"
+
+class TtsCache:
+    """
+    Size-bounded LRU cache of synthesized PCM audio on disk.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = 200 * 1024 * 1024):
+        self.logger = logging.getLogger('tts_cache')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Key -> size, least recently used first
+        entries = sorted(self.directory.glob("*" + EXTENSION), key=lambda path: path.stat().st_mtime)
+        self.entries: OrderedDict = OrderedDict((path.stem, path.stat().st_size) for path in entries)
+        self.size = sum(self.entries.values())
+
+    @staticmethod
+    def key(text: str, voice: str, model: str, instructions: str, response_format: str = "pcm") -> str:
+        """
+        Gets the cache key of an utterance.
+        """
+        description = json.dumps([text, voice, model, instructions, response_format], ensure_ascii=False)
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + EXTENSION)
+
+    def get(self, key: str) -> np.ndarray:
+        """
+        Gets cached audio.
+
+        @returns np.ndarray - int16 samples backed by a read-only memory map, or None on a miss
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path) # Most recently used
+        except (OSError, ValueError) as e: # Deleted behind our back, or empty
+            self.logger.warning(f"Dropping unreadable cache entry {key[:12]}: {e}")
+            with self.lock:
+                self.size -= self.entries.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return np.frombuffer(mapped, dtype=np.int16)
+
+    def put(self, key: str, pcm: bytes):
+        """
+        Stores audio, evicting the least recently used entries if the cache is over its size.
+        """
+        if not pcm or len(pcm) > self.max_bytes:
+            return
+
+        # Write to a temporary file first, so a crash never leaves a truncated entry behind
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(pcm)
+        os.replace(temporary_path, self._path(key))
+
+        with self.lock:
+            self.size += len(pcm) - self.entries.pop(key, 0)
+            self.entries[key] = len(pcm)
+
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                evicted, size = self.entries.popitem(last=False)
+                self.size -= size
+                self._path(evicted).unlink(missing_ok=True)
+                self.logger.debug(f"Evicted {evicted[:12]} ({size} bytes)")
+
+    def __str__(self):
+        """Returns a string representation of the cache state."""
+        return f"{len(self.entries)} entries, {self.size / 1024 / 1024:.1f} MB, hits={self.hits}, misses={self.misses}"
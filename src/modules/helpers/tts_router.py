@@ -0,0 +1,173 @@
+"""
+Latency-aware routing of utterances between TTS backends.
+
+Backends are listed in order of preference (best voice first, local synthesis last). For every
+utterance the router picks the most preferred backend whose recent latency (time to first audio,
+so it doesn't grow with the length of the text) fits the latency budget, and lists the others as
+fallbacks in case it fails.
+
+Each cloud backend sits behind a circuit breaker. Consecutive failures or over-budget requests,
+or a high recent error rate, open it: the backend is skipped (so speech falls back to local
+synthesis) until a cooldown has passed, then a single probe request decides whether it closes
+again. The local backend is never broken; it is always the last resort.
+"""
+
+import logging, time
+from modules.models.tts_backend import TtsBackend
+from modules.models.tts_backend_stats import TtsBackendStats
+
+class CircuitBreaker:
+    """
+    Closed (requests flow), open (backend skipped) or half-open (one probe allowed) after a cooldown.
+    """
+
+    def __init__(self, failure_threshold: int = 3, error_rate_threshold: float = 0.5, min_requests: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self.strikes = 0 # Consecutive failed or over-budget requests
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allows(self) -> bool:
+        """Checks whether a request may go to the backend (moving to half-open once the cooldown has passed)."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half-open"
+            self.probing = False
+        if self.state == "half-open":
+            return not self.probing
+        return self.state == "closed"
+
+    def record(self, ok: bool, stats: TtsBackendStats) -> bool:
+        """
+        Records the outcome of a request.
+
+        @returns bool - Whether the breaker changed state
+        """
+        previous = self.state
+        self.probing = False
+        self.strikes = 0 if ok else self.strikes + 1
+
+        if self.state == "half-open":
+            self.state = "closed" if ok else "open"
+        elif self.state == "closed" and not ok and (self.strikes >= self.failure_threshold or
+                                         (len(stats.recent) >= self.min_requests and stats.error_rate >= self.error_rate_threshold)):
+            self.state = "open"
+
+        if self.state == "open" and previous != "open":
+            self.opened_at = time.monotonic()
+        return self.state != previous
+
+class TtsRouter:
+    """
+    Picks a TTS backend per utterance from rolling latency and error rate, under a latency budget.
+    """
+
+    def __init__(self, backends: list[TtsBackend], latency_budget: float = 1.5, timeout: float = 5.0, window: int = 20,
+                 failure_threshold: int = 3, error_rate_threshold: float = 0.5, cooldown: float = 30.0):
+        """
+        Args:
+            backends (list[TtsBackend]): In order of preference
+            latency_budget (float): Longest acceptable time to the first audio of an utterance (seconds)
+            timeout (float): Synthesis requests (cloud or local) taking longer than this fail (seconds)
+            window (int): Recent requests the rolling latency and error rate cover
+            failure_threshold (int): Consecutive failed or over-budget requests that open a breaker
+            error_rate_threshold (float): Recent error rate that opens a breaker
+            cooldown (float): Seconds a breaker stays open before a probe is allowed
+        """
+        self.logger = logging.getLogger('tts_router')
+        self.backends = backends
+        self.latency_budget = latency_budget
+        self.timeout = timeout
+        self.stats = {backend.name: TtsBackendStats(window=window) for backend in backends}
+        self.breakers = {backend.name: CircuitBreaker(failure_threshold, error_rate_threshold, cooldown=cooldown)
+                         for backend in backends if not backend.local}
+
+    def available(self, backend: TtsBackend) -> bool:
+        """Checks whether a backend can take a request right now."""
+        return backend.local or self.breakers[backend.name].allows()
+
+    def candidates(self) -> list[TtsBackend]:
+        """
+        Gets the backends to try for the next utterance: the chosen one first, then the fallbacks in order of preference.
+        """
+        available = [backend for backend in self.backends if self.available(backend)]
+        if not available:
+            return []
+
+        # The most preferred backend expected to fit the budget (untried and probing backends are given the benefit
+        # of the doubt), otherwise the fastest one
+        def expected(backend: TtsBackend) -> float:
+            if not backend.local and self.breakers[backend.name].state == "half-open":
+                return 0.0
+            latency = self.stats[backend.name].expected_latency
+            return 0.0 if latency is None else latency
+
+        within_budget = [backend for backend in available if expected(backend) <= self.latency_budget]
+        chosen = within_budget[0] if within_budget else min(available, key=expected)
+        return [chosen] + [backend for backend in available if backend is not chosen]
+
+    def claim(self, backend: TtsBackend) -> bool:
+        """
+        Claims a request to a backend right before it is sent. A half-open backend is marked as
+        probing, so only one request at a time can probe it (fallbacks included).
+
+        @returns bool - Whether the request may go ahead
+        """
+        if backend.local:
+            return True
+        breaker = self.breakers[backend.name]
+        if not breaker.allows():
+            return False
+        if breaker.state == "half-open":
+            breaker.probing = True
+            self.logger.info(f"Probing {backend} after its cooldown.")
+        return True
+
+    def record_success(self, backend: TtsBackend, latency: float):
+        """Records a successful synthesis and its time to first audio; an over-budget one still counts against the backend's breaker."""
+        stats = self.stats[backend.name]
+        stats.record_success(latency)
+        if not backend.local:
+            self._record_outcome(backend, latency <= self.latency_budget)
+
+    def record_failure(self, backend: TtsBackend, error: Exception):
+        """Records a failed synthesis."""
+        self.logger.warning(f"{backend} failed: {error!r}")
+        self.stats[backend.name].record_failure()
+        if not backend.local:
+            self._record_outcome(backend, False)
+
+    def record_cancelled(self, backend: TtsBackend):
+        """Records a synthesis that was cancelled before it finished (it says nothing about the backend)."""
+        if not backend.local:
+            self.breakers[backend.name].probing = False
+
+    def _record_outcome(self, backend: TtsBackend, ok: bool):
+        """Updates a cloud backend's breaker, logging when it opens or closes."""
+        breaker = self.breakers[backend.name]
+        if breaker.record(ok, self.stats[backend.name]):
+            if breaker.state == "open":
+                self.logger.warning(f"Circuit breaker opened for {backend} ({self.stats[backend.name]}); "
+                                    f"routing around it for {breaker.cooldown:.0f}s.")
+            else:
+                self.logger.info(f"Circuit breaker closed for {backend}.")
+
+    def histograms(self) -> dict:
+        """
+        Gets every backend's latency histogram.
+
+        @returns dict - Backend name -> (bucket label -> count)
+        """
+        return {name: stats.histogram_buckets() for name, stats in self.stats.items()}
+
+    def __str__(self):
+        """Returns a string representation of every backend's state."""
+        lines = []
+        for backend in self.backends:
+            state = self.breakers[backend.name].state if not backend.local else "local"
+            lines.append(f"{backend.name} [{state}]: {self.stats[backend.name]}")
+        return "\n".join(lines)
@@ -0,0 +1,160 @@
+"""
+Multi-speaker verifier bank for the wake word.
+
+openWakeWord's custom verifiers are scikit-learn pipelines (flatten -> StandardScaler ->
+LogisticRegression) trained on the wake model's embedding features (see
+activation_model/training/train_verifier.py). Every stage is affine until the final sigmoid, so each
+verifier folds into a single weight vector and bias. The bank stacks those into one matrix and
+scores every registered speaker against the shared embedding of a detection with a single
+matrix-vector product, so adding speakers costs almost nothing. Verifiers that don't have that exact
+shape still work; they are just scored one by one.
+
+To benchmark the per-detection verification cost (from the repo root):
+    python src/modules/helpers/verifier_bank.py
+"""
+
+import logging, pickle
+import numpy as np
+
+class VerifierBank:
+    """
+    Scores any number of speaker verifiers against one wake model embedding.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('verifier_bank')
+
+        self._speakers: list[str] = []         # Speakers folded into the weight matrix (row order)
+        self._weights = None                   # (n_speakers, n_features)
+        self._biases = None                    # (n_speakers,)
+        self._fallback: dict = {}              # Speaker name -> pipeline scored with predict_proba
+
+    @property
+    def speakers(self) -> list[str]:
+        """Names of every registered speaker."""
+        return self._speakers + list(self._fallback.keys())
+
+    def __len__(self):
+        return len(self._speakers) + len(self._fallback)
+
+    @staticmethod
+    def _fold(pipeline) -> tuple:
+        """
+        Folds a flatten -> StandardScaler -> LogisticRegression pipeline into (weights, bias).
+
+        Returns:
+            tuple: (weights, bias), or None if the pipeline has a different shape
+        """
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import FunctionTransformer, StandardScaler
+
+        steps = [step for _, step in getattr(pipeline, "steps", [])]
+        if len(steps) != 3 or not isinstance(steps[0], FunctionTransformer) or not isinstance(steps[1], StandardScaler) \
+                or not isinstance(steps[2], LogisticRegression) or steps[2].coef_.shape[0] != 1:
+            return None
+
+        scaler, classifier = steps[1], steps[2]
+        coef = classifier.coef_[0].astype(np.float64)
+        mean = scaler.mean_ if scaler.mean_ is not None else 0.0
+        scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+
+        # w . ((x - mean) / scale) + b  ==  (w / scale) . x + (b - w . (mean / scale))
+        weights = coef / scale
+        bias = float(classifier.intercept_[0] - np.sum(coef * mean / scale))
+        return weights, bias
+
+    def register(self, speaker: str, pipeline):
+        """
+        Registers a speaker's verifier pipeline.
+        """
+        folded = self._fold(pipeline)
+        if folded is None:
+            self.logger.warning(f"Verifier for '{speaker}' can't be folded into the bank; it will be scored separately.")
+            self._fallback[speaker] = pipeline
+            return
+
+        weights, bias = folded
+        if self._weights is None:
+            self._weights = weights[None, :].astype(np.float32)
+            self._biases = np.array([bias], dtype=np.float32)
+        else:
+            self._weights = np.vstack((self._weights, weights[None, :].astype(np.float32)))
+            self._biases = np.append(self._biases, np.float32(bias))
+        self._speakers.append(speaker)
+
+    def load(self, verifier_paths: dict):
+        """
+        Registers pickled verifiers.
+
+        Args:
+            verifier_paths (dict): Speaker name -> path of the speaker's pickled verifier
+        """
+        for speaker, path in verifier_paths.items():
+            with open(path, "rb") as f:
+                self.register(speaker, pickle.load(f))
+
+        self.logger.info(f"Loaded {len(verifier_paths)} speaker verifier(s): {', '.join(verifier_paths)}")
+
+    def score(self, features: np.ndarray) -> dict:
+        """
+        Scores every speaker against one embedding window.
+
+        Args:
+            features (np.ndarray): The wake model's input features, shape (1, n_frames, n_dims)
+
+        Returns:
+            dict: Speaker name -> probability that the speaker said the wake phrase
+        """
+        scores = {}
+        if self._weights is not None:
+            logits = self._weights @ features.reshape(-1) + self._biases
+            probabilities = 1.0 / (1.0 + np.exp(-logits))
+            scores = dict(zip(self._speakers, probabilities.tolist()))
+
+        for speaker, pipeline in self._fallback.items():
+            scores[speaker] = float(pipeline.predict_proba(features)[0][-1])
+
+        return scores
+
+    def best(self, features: np.ndarray) -> tuple:
+        """
+        Finds the speaker most likely to have said the wake phrase.
+
+        Returns:
+            tuple: (speaker name, probability), or (None, 0.0) if no speakers are registered
+        """
+        scores = self.score(features)
+        if not scores:
+            return None, 0.0
+
+        speaker = max(scores, key=scores.get)
+        return speaker, scores[speaker]
+
+if __name__ == "__main__":
+    import time
+    from pathlib import Path
+
+    # Register copies of the bundled verifier as stand-in speakers and time one detection's verification
+    verifier_path = Path(__file__).resolve().parents[3] / "activation_model" / "training" / "riley_model.pkl"
+    with open(verifier_path, "rb") as f:
+        pipeline = pickle.load(f)
+
+    features = np.random.default_rng(0).normal(size=(1, 16, 96)).astype(np.float32)
+    runs = 500
+    for n_speakers in (1, 5, 20):
+        bank = VerifierBank()
+        for i in range(n_speakers):
+            bank.register(f"speaker_{i}", pipeline)
+
+        started = time.perf_counter()
+        for _ in range(runs):
+            bank.best(features)
+        bank_us = (time.perf_counter() - started) / runs * 1e6
+
+        # One predict_proba per speaker, the way separate openWakeWord verifiers would run
+        started = time.perf_counter()
+        for _ in range(runs):
+            [pipeline.predict_proba(features) for _ in range(n_speakers)]
+        separate_us = (time.perf_counter() - started) / runs * 1e6
+
+        print(f"{n_speakers:>2} speaker(s): bank {bank_us:8.1f} us/detection   separate verifiers {separate_us:8.1f} us/detection")
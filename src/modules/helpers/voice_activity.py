@@ -0,0 +1,153 @@
+"""
+Voice activity detection for TARS' microphone frames.
+
+Detectors work on batches of 80 ms frames at once (an (n_frames, frame_samples) int16 array, as
+returned by AudioCaptureReader.read_frames) and return one speech/non-speech decision per frame.
+Every detector shares the same hangover logic: once a frame is classified as speech, the detector
+stays "in speech" for `hangover` seconds after the last voiced frame so short pauses between words
+don't end an utterance.
+
+To plug in a different detector, subclass VoiceActivityDetector and implement _classify().
+"""
+
+import numpy as np
+
+class VoiceActivityDetector:
+    """
+    Base class for voice activity detectors.
+    """
+
+    def __init__(self, sample_rate: int = 16_000, frame_samples: int = 1280, hangover: float = 0.5):
+        """
+        Args:
+            sample_rate (int): Sample rate of the frames in Hz
+            frame_samples (int): Samples per frame
+            hangover (float): Seconds to stay in speech after the last voiced frame
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.hangover = hangover
+
+        # Frames since the last voiced frame (large = no recent speech)
+        self._frames_since_voice = np.iinfo(np.int64).max // 2
+        self.is_speech = False
+
+    @property
+    def hangover_frames(self) -> int:
+        """Hangover time as a whole number of frames."""
+        return int(round(self.hangover * self.sample_rate / self.frame_samples))
+
+    def reset(self):
+        """Forgets any speech in progress."""
+        self._frames_since_voice = np.iinfo(np.int64).max // 2
+        self.is_speech = False
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Classifies each frame on its own, without hangover.
+
+        Returns:
+            np.ndarray: Boolean array of shape (n_frames,)
+        """
+        raise NotImplementedError
+
+    def process(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Classifies a batch of frames, applying hangover across the batch and from earlier batches.
+
+        Args:
+            frames (np.ndarray): int16 array of shape (n_frames, frame_samples) or (frame_samples,)
+
+        Returns:
+            np.ndarray: Boolean array of shape (n_frames,), True where the detector is in speech
+        """
+        frames = np.atleast_2d(frames)
+        voiced = self._classify(frames)
+
+        # Index of the most recent voiced frame at or before each frame (previous batches count as negative indices)
+        indices = np.arange(len(voiced))
+        last_voiced = np.maximum.accumulate(np.where(voiced, indices, -1 - self._frames_since_voice))
+        frames_since_voice = indices - last_voiced
+
+        decisions = frames_since_voice <= self.hangover_frames
+        if len(voiced):
+            self._frames_since_voice = int(frames_since_voice[-1])
+            self.is_speech = bool(decisions[-1])
+
+        return decisions
+
+class EnergyVad(VoiceActivityDetector):
+    """
+    Fixed RMS energy threshold (what SpeechRecognition's energy_threshold did).
+    """
+
+    def __init__(self, energy_threshold: float = 400, **kwargs):
+        super().__init__(**kwargs)
+        self.energy_threshold = energy_threshold
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        return rms > self.energy_threshold
+
+class AdaptiveVad(VoiceActivityDetector):
+    """
+    Adaptive noise floor + spectral shape detector.
+
+    A frame is voiced when its energy is `margin_db` above the tracked noise floor, its spectrum is
+    tonal rather than noise-like (low spectral flatness), and most of its energy sits in the speech
+    band. The noise floor follows quiet frames down immediately and rises at most `floor_rise` dB/s,
+    so it adapts to a noisy room without climbing into speech.
+    """
+
+    def __init__(self, margin_db: float = 10.0, floor_rise: float = 3.0, max_flatness: float = 0.35,
+                 min_band_ratio: float = 0.5, speech_band: tuple = (80, 4000), **kwargs):
+        """
+        Args:
+            margin_db (float): How far above the noise floor (dB) a frame must be to count as speech
+            floor_rise (float): Maximum rate (dB/s) at which the noise floor may rise
+            max_flatness (float): Maximum spectral flatness (0 = pure tone, 1 = white noise) of speech
+            min_band_ratio (float): Minimum fraction of frame energy inside the speech band
+            speech_band (tuple): Speech band edges in Hz
+        """
+        super().__init__(**kwargs)
+        self.margin_db = margin_db
+        self.floor_rise = floor_rise
+        self.max_flatness = max_flatness
+        self.min_band_ratio = min_band_ratio
+
+        # Precompute the analysis window and speech band bins
+        self._window = np.hanning(self.frame_samples).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame_samples, d=1.0 / self.sample_rate)
+        self._band = (freqs >= speech_band[0]) & (freqs <= speech_band[1])
+
+        self.noise_floor = None # dB
+
+    def _track_noise_floor(self, energy_db: np.ndarray) -> np.ndarray:
+        """
+        Tracks the noise floor over a batch: floor[k] = min(energy[k], floor[k-1] + rise).
+        Unrolled, that is a running minimum of (energy[j] - j * rise) shifted by k * rise.
+        """
+        rise = self.floor_rise * self.frame_samples / self.sample_rate
+        previous = energy_db[0] if self.noise_floor is None else self.noise_floor
+
+        steps = np.arange(len(energy_db)) * rise
+        floor = np.minimum(np.minimum.accumulate(energy_db - steps), previous + rise) + steps
+
+        self.noise_floor = float(floor[-1])
+        return floor
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        samples = frames.astype(np.float32)
+
+        # Frame energy against the adaptive floor
+        energy_db = 10 * np.log10(np.mean(samples ** 2, axis=1) + 1.0)
+        floor = self._track_noise_floor(energy_db)
+        loud = energy_db > floor + self.margin_db
+
+        # Spectral shape over the speech band
+        power = np.abs(np.fft.rfft(samples * self._window, axis=1)) ** 2 + 1e-10
+        band_power = power[:, self._band]
+        flatness = np.exp(np.mean(np.log(band_power), axis=1)) / np.mean(band_power, axis=1)
+        band_ratio = band_power.sum(axis=1) / power.sum(axis=1)
+
+        return loud & (flatness < self.max_flatness) & (band_ratio > self.min_band_ratio)
@@ -0,0 +1,116 @@
+"""
+Builds the openWakeWord model for a WakeWordEngineConfig.
+
+openWakeWord only exposes a single `ncpu` knob (used for the feature models) and always runs the
+wake word model itself on one thread. For ONNX, every session is rebuilt here with the configured
+intra-op/inter-op thread counts and graph optimization level; for TFLite, the wake word model's
+interpreter is rebuilt with the configured thread count.
+"""
+
+import functools, logging, os
+import openwakeword as oww
+from modules.models.wake_word_engine_config import WakeWordEngineConfig
+
+logger = logging.getLogger('wake_word_engine')
+
+# Model store name of the wake word model for each engine
+MODEL_FILES = {
+    "onnx": "hey_tars.onnx",
+    "tflite": "hey_tars.tflite",
+    "tflite_float16": "hey_tars_float16.tflite",
+}
+
+def _onnx_predict(session, x):
+    """Runs an ONNX wake word model (same contract as openWakeWord's own prediction functions)."""
+    return session.run(None, {session.get_inputs()[0].name: x})
+
+def _tflite_predict(interpreter, input_index: int, output_index: int, x):
+    """Runs a TFLite wake word model (same contract as openWakeWord's own prediction functions)."""
+    interpreter.set_tensor(input_index, x)
+    interpreter.invoke()
+    return interpreter.get_tensor(output_index)[None, ]
+
+def _onnx_session_options(config: WakeWordEngineConfig):
+    """Creates ONNX Runtime session options for the config."""
+    import onnxruntime as ort
+
+    levels = {
+        "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config.intra_op_threads
+    options.inter_op_num_threads = config.inter_op_threads
+    options.graph_optimization_level = levels[config.graph_optimization_level]
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL if config.inter_op_threads <= 1 else ort.ExecutionMode.ORT_PARALLEL
+    return options
+
+def _rebuild_onnx_sessions(model: oww.Model, model_paths: dict, config: WakeWordEngineConfig):
+    """Replaces every ONNX session in the model with one built from the config's session options."""
+    import onnxruntime as ort
+
+    options = _onnx_session_options(config)
+    providers = ["CPUExecutionProvider"]
+    feature_dir = os.path.join(os.path.dirname(oww.__file__), "resources", "models")
+
+    # Feature models (the preprocessor's predict lambdas look the sessions up on every call)
+    preprocessor = model.preprocessor
+    preprocessor.melspec_model = ort.InferenceSession(os.path.join(feature_dir, "melspectrogram.onnx"), sess_options=options, providers=providers)
+    preprocessor.embedding_model = ort.InferenceSession(os.path.join(feature_dir, "embedding_model.onnx"), sess_options=options, providers=providers)
+
+    # Wake word models
+    for name, path in model_paths.items():
+        session = ort.InferenceSession(path, sess_options=options, providers=providers)
+        model.models[name] = session
+        model.model_prediction_function[name] = functools.partial(_onnx_predict, session)
+
+def _rebuild_tflite_interpreters(model: oww.Model, model_paths: dict, config: WakeWordEngineConfig):
+    """Replaces every TFLite wake word interpreter in the model with one using the config's thread count."""
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        # openWakeWord fell back to the ONNX models, so there are no interpreters to rebuild
+        return
+
+    for name, path in model_paths.items():
+        interpreter = tflite.Interpreter(model_path=path, num_threads=config.tflite_threads)
+        interpreter.allocate_tensors()
+        model.models[name] = interpreter
+        model.model_prediction_function[name] = functools.partial(
+            _tflite_predict, interpreter, interpreter.get_input_details()[0]['index'], interpreter.get_output_details()[0]['index'])
+
+def inference_framework(config: WakeWordEngineConfig) -> str:
+    """Gets the openWakeWord inference framework ("onnx" or "tflite") for the config's engine."""
+    return "onnx" if config.engine == "onnx" else "tflite"
+
+def build_wake_word_model(config: WakeWordEngineConfig, model_path: str, **kwargs) -> oww.Model:
+    """
+    Builds the wake word model for the configured engine.
+
+    Args:
+        config (WakeWordEngineConfig): Engine settings
+        model_path (str): Path of the hey_tars model file for the engine (see MODEL_FILES)
+        kwargs: Any other keyword arguments for oww.Model (e.g. custom verifier settings)
+
+    Returns:
+        oww.Model: The loaded model
+    """
+    framework = inference_framework(config)
+    ncpu = config.intra_op_threads if framework == "onnx" else config.tflite_threads
+
+    model = oww.Model(
+        wakeword_models=[model_path],
+        inference_framework=framework,
+        ncpu=ncpu,
+        **kwargs)
+
+    if framework == "onnx":
+        _rebuild_onnx_sessions(model, {name: model_path for name in model.models}, config)
+    elif config.tflite_threads != 1:
+        _rebuild_tflite_interpreters(model, {name: model_path for name in model.models}, config)
+
+    logger.info(f"Wake word engine: {config}")
+    return model
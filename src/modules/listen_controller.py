@@ -1,12 +1,29 @@
-import sounddevice
-import dotenv, json, logging, numpy as np, openwakeword as oww, pyaudio, speech_recognition as sr, vosk
+from typing import Callable
+import collections, json, logging, threading, time, numpy as np, speech_recognition as sr, vosk
+from modules.helpers.audio_capture import AudioCapture
+from modules.helpers.audio_output import AudioOutput
+from modules.helpers.echo_suppressor import EchoSuppressor
+from modules.helpers.voice_activity import VoiceActivityDetector, AdaptiveVad
+from modules.helpers.model_store import ModelStore
+from modules.helpers.verifier_bank import VerifierBank
+from modules.helpers.wake_word_engine import MODEL_FILES, build_wake_word_model, inference_framework
+from modules.models.wake_detection import WakeDetection
+from modules.models.wake_gate_stats import WakeGateStats
+from modules.models.wake_word_engine_config import WakeWordEngineConfig
+
+SAMPLE_RATE = 16_000
+FRAME_SAMPLES = 1280 # 80 ms; the frame size openwakeword scores on
 
 
 class ListenController():
     """
     Controller for listening to audio input and performing actions/transcribing onto/with it.
     """
-    def __init__(self, env_path: str = "../.env"):
+    def __init__(self, env_path: str = "../.env", command_preroll: float = 0.25, streaming_stt: bool = True,
+                 vad_factory: Callable[..., VoiceActivityDetector] = AdaptiveVad, wake_vad_hangover: float = 1.0,
+                 command_hangover: float = 0.6, phrase_time_limit: float = 15.0, wake_gate: bool = True,
+                 wake_gate_context: float = 2.0, wake_word_engine: WakeWordEngineConfig = None,
+                 speaker_verifiers: dict = None):
         # Initialize logger
         self.logger = logging.getLogger('listen_controller')
         self.logger.info("Initializing ListenController...")
@@ -14,63 +31,281 @@ class ListenController():
         # Initialize AssemblyAI API
         #aai.settings.api_key = dotenv.get_key(dotenv_path=env_path, key_to_get="ASSEMBLY_AI_API_KEY")
         
-        # Init speech recognizer
+        # Init speech recognizer (only used to decode whole clips when streaming STT is off)
         self.recognizer = sr.Recognizer()
-        self.recognizer.dynamic_energy_threshold = False
-        self.recognizer.energy_threshold = 400
 
-        # Init microphone
-        self.microphone = sr.Microphone(sample_rate=16_000, chunk_size=1280)
+        # Init the local model store; model paths resolve against the repo, not the working directory
+        self.model_store = ModelStore()
+        
+        # Init microphone (one always-open capture stream shared by every consumer)
+        self.capture = AudioCapture(sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES)
+        self.capture.start()
+        self.wake_reader = self.capture.reader()
+        self.command_reader = self.capture.reader()
+        
+        # Seconds of audio before the wake frame handed to the command recognizer
+        self.command_preroll = command_preroll
+        self.last_handoff_delay = None # Seconds from wake detection to command capture starting
+        self.last_handoff_gap = None # Seconds of audio lost between the wake frame and the command
+        
+        # Init voice activity detection; the wake VAD gates detections, the command VAD ends utterances
+        self.wake_vad = vad_factory(sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES, hangover=wake_vad_hangover)
+        self.command_vad = vad_factory(sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES, hangover=command_hangover)
+        self.phrase_time_limit = phrase_time_limit
+        
+        # Init offline speech recognition (vosk); one long-lived recognizer decodes while the user speaks
+        self.streaming_stt = streaming_stt
+        if streaming_stt:
+            vosk.SetLogLevel(-1)
+            self.vosk_model = vosk.Model(self.model_store.path("vosk"))
+            self.vosk_recognizer = vosk.KaldiRecognizer(self.vosk_model, SAMPLE_RATE)
+        
+        # Init wake word model (engine and thread settings come from the .env file unless given)
+        self.wake_word_engine = wake_word_engine if wake_word_engine is not None else WakeWordEngineConfig.from_env(env_path)
+        self.model_store.ensure_feature_models(inference_framework(self.wake_word_engine))
+        self.wake_word_model = build_wake_word_model(
+            self.wake_word_engine,
+            model_path=self.model_store.path(MODEL_FILES[self.wake_word_engine.engine]))
+        self.wake_word = next(iter(self.wake_word_model.models)) # openWakeWord names it after the file (e.g. hey_tars_float16)
+        self.wake_word_threshold = 0.5
         
-        # init offline speech recognition (vosk)
-        #self.vosk_model = vosk.Model("models/vosk-model-small-en-us-0.15")
-        #self.vosk_recognizer = vosk.KaldiRecognizer(self.vosk_model, 16_000)
+        # Speaker verifiers (speaker name -> verifier path; every verifier in the model manifest unless given),
+        # all scored in one pass against the wake model's embedding once the raw score passes the verifier threshold
+        self.verifier_bank = VerifierBank()
+        self.verifier_bank.load(speaker_verifiers if speaker_verifiers is not None else self.model_store.verifiers())
+        self.verifier_threshold = 0.3
         
-        # Init wake word model
-        oww.utils.download_models()
-        self.wake_word_model = oww.Model(
-            wakeword_models=["activation_model/hey_tars.onnx"],
-            custom_verifier_models={"hey_tars": f"activation_model/training/riley_model.pkl"},
-            custom_verifier_threshold=0.3,
-            inference_framework="onnx")
+        # Skip wake word inference on frames the wake VAD calls silent (they could never be accepted anyway)
+        self.wake_gate = wake_gate
+        self.wake_gate_context = wake_gate_context # Seconds replayed into the model when the gate opens
+        self.wake_gate_stats = WakeGateStats()
+        
+        # Echo suppression on the wake word path, so TARS can be interrupted without waking itself up
+        self.echo_suppressor: EchoSuppressor = None
         
         # Log
         self.logger.info("ListenController initialized successfully.")
 
-    def listen_for_wake_phrase(self):
+    def enable_echo_suppression(self, output: AudioOutput):
+        """
+        Removes what the given output plays from the audio the wake word model hears.
         """
-        Continuously listens until the wake phrase(s) is detected.
+        self.echo_suppressor = EchoSuppressor(output, sample_rate=SAMPLE_RATE)
+        self.logger.info("Echo suppression enabled on the wake word path.")
+
+    def listen_for_wake_phrase(self, timeout: float = None, stop_event: threading.Event = None) -> WakeDetection:
+        """
+        Streams microphone frames into the wake word model until the wake phrase(s) is detected.
+        
+        @param stop_event - Stops listening (within a frame or so) once set
+        @returns WakeDetection - The detection, or None if the timeout elapsed or it was stopped first
         """
         self.logger.info("Waiting for wake phrase ('Hey TARS')...")
-        with self.microphone as source:
-            # Listen for speaking
-            audio = self.recognizer.listen(source=source, phrase_time_limit=2.0)
-            
-            # Log
-            self.logger.info("Analyzing speech...")
-            
-            # Transform audio to numpy array and predict wake word
-            audio_data = np.frombuffer(audio.get_raw_data(), dtype=np.int16)
+        
+        # Clear features left over from the last detection so it doesn't fire again
+        self.wake_word_model.reset()
+        
+        frame_duration = self.capture.frame_duration
+        max_frames = int(timeout / frame_duration) if timeout is not None else None
+        frame_index = 0
+        context_samples = int(self.wake_gate_context * SAMPLE_RATE) // FRAME_SAMPLES * FRAME_SAMPLES
+        
+        # With echo suppression on, the model only ever sees cleaned audio, so gate replays come from its own history
+        cleaned_history = collections.deque(maxlen=context_samples // FRAME_SAMPLES)
+        if self.echo_suppressor is not None:
+            self.echo_suppressor.reset()
+        
+        # Start at the live edge; anything captured before now isn't part of this wake attempt
+        self.wake_reader.seek(self.capture.write_position)
+        
+        # Capture position the model's feature buffers are up to date with; gate replays never reach back before the seek
+        scored_until = self.wake_reader.position
+        while max_frames is None or frame_index < max_frames:
+            # Wait for the next frame(s) from the capture thread
+            frames = self.wake_reader.read_frames(max_frames=8)
+            if frames is None or (stop_event is not None and stop_event.is_set()): # Capture stopped or told to stop
+                return None
+            batch_start = self.wake_reader.position - len(frames) * FRAME_SAMPLES
             
-            # Predict wake word
-            predictions = self.wake_word_model.predict_clip(audio_data)
+            # Take TARS' own voice out before anything listens to the frames
+            if self.echo_suppressor is not None:
+                frames = np.stack([
+                    self.echo_suppressor.process(frame, self.capture.time_at(batch_start + i * FRAME_SAMPLES))
+                    for i, frame in enumerate(frames)])
+                cleaned_history.extend((batch_start + i * FRAME_SAMPLES, frame) for i, frame in enumerate(frames))
+            voice = self.wake_vad.process(frames)
             
-            # Check predictions across all segments
-            detected = any(pred["hey_tars"] > 0.5 for pred in predictions)
-
-            return detected
+            for i, frame in enumerate(frames):
+                frame_start = batch_start + i * FRAME_SAMPLES
+                
+                # Gate closed: no voice, so skip inference entirely
+                if self.wake_gate and not voice[i]:
+                    self.wake_gate_stats.frames_skipped += 1
+                    frame_index += 1
+                    continue
+                
+                captured_at = time.perf_counter()
+                
+                # Gate just opened: replay the skipped context so the melspectrogram/embedding buffers are warm
+                context_start = max(scored_until, frame_start - context_samples, self.capture.oldest_position)
+                if context_start < frame_start:
+                    if self.echo_suppressor is not None:
+                        context = [past for start, past in cleaned_history if context_start <= start < frame_start]
+                        if context:
+                            self.wake_word_model.predict(np.concatenate(context))
+                    else:
+                        self.wake_word_model.predict(self.capture.view(context_start, frame_start))
+                    self.wake_gate_stats.frames_replayed += (frame_start - context_start) // FRAME_SAMPLES
+                
+                # Score the frame, then check who said it against the same embedding window
+                score = self.wake_word_model.predict(frame)[self.wake_word]
+                speaker = None
+                if len(self.verifier_bank) > 0 and score >= self.verifier_threshold:
+                    features = self.wake_word_model.preprocessor.get_features(self.wake_word_model.model_inputs[self.wake_word])
+                    speaker, score = self.verifier_bank.best(features)
+                inference_time = time.perf_counter() - captured_at
+                scored_until = frame_start + FRAME_SAMPLES
+                self.wake_gate_stats.frames_scored += 1
+                
+                # Only accept detections while the VAD hears a voice, so noise bursts can't wake TARS
+                if score >= self.wake_word_threshold and voice[i]:
+                    self.logger.info(f"Wake gate: {self.wake_gate_stats}")
+                    frames_behind = len(frames) - 1 - i
+                    return WakeDetection(
+                        score=float(score),
+                        speaker=speaker,
+                        frame_index=frame_index,
+                        audio_time=(frame_index + 1) * frame_duration,
+                        inference_time=inference_time,
+                        latency=(frames_behind + 1) * frame_duration + inference_time,
+                        position=self.wake_reader.position - frames_behind * FRAME_SAMPLES,
+                        detected_at=time.perf_counter())
+                
+                frame_index += 1
+        
+        return None
 
-    def listen_for_command(self, timeout=5):
-        """Listens for the command after the wake word has been detected."""
+    def listen_for_command(self, timeout=5, wake_detection: WakeDetection = None, on_partial: Callable[[str], None] = None):
+        """
+        Listens for the command after the wake word has been detected.
+        
+        Capture starts from the ring buffer history, `command_preroll` seconds before the wake
+        frame, so a command spoken straight after the wake phrase isn't cut off.
+        
+        In streaming mode every frame is decoded by vosk as it arrives, and `on_partial` is called
+        with the partial hypothesis whenever it changes, so the final text is ready almost as soon
+        as speech ends.
+        
+        @returns str - The transcribed command, or None if no speech started within the timeout
+        """
         self.logger.info("Listening for command...")
-        with self.microphone as source:
-            # Listen for speaking
-            audio = self.recognizer.listen(source=source)
+        
+        frame_duration = self.capture.frame_duration
+        
+        # Start from the wake frame (or wherever the wake reader stopped) minus the pre-roll
+        wake_position = wake_detection.position if wake_detection is not None else self.wake_reader.position
+        self.command_reader.seek(wake_position - int(self.command_preroll * SAMPLE_RATE))
+        start_position = max(self.command_reader.position, self.capture.oldest_position)
+        
+        # Measure the handoff: how long after the detection capture resumed, and how much audio was lost
+        self.last_handoff_gap = max(0, start_position - wake_position) / SAMPLE_RATE
+        self.last_handoff_delay = time.perf_counter() - wake_detection.detected_at if wake_detection is not None else 0.0
+        self.logger.info(f"Command capture handoff: {self.last_handoff_delay * 1000:.1f}ms after wake, "
+                         f"{self.last_handoff_gap * 1000:.0f}ms of audio lost, "
+                         f"{(wake_position - start_position) / SAMPLE_RATE * 1000:.0f}ms pre-roll")
+        
+        frames = []
+        segments = []
+        partial = ""
+        if self.streaming_stt:
+            self.vosk_recognizer.Reset()
+        
+        def feed(frame: np.ndarray):
+            """Hands a frame to the recognizer."""
+            nonlocal partial
+            if self.streaming_stt:
+                # Decode now; vosk returns True when it finalizes a segment at a pause
+                if self.vosk_recognizer.AcceptWaveform(frame.tobytes()):
+                    segments.append(json.loads(self.vosk_recognizer.Result())["text"])
+                else:
+                    new_partial = json.loads(self.vosk_recognizer.PartialResult())["partial"]
+                    if new_partial != partial:
+                        partial = new_partial
+                        self.logger.debug(f"Partial transcript: '{partial}'")
+                        if on_partial is not None:
+                            on_partial(" ".join(segments + [partial]).strip())
+            else:
+                # Frames are views into the ring buffer, so keep a copy
+                frames.append(frame.copy())
+        
+        # Pre-roll frames go to the recognizer, but they hold the tail of the wake phrase so the VAD never sees them
+        while self.command_reader.position < wake_position:
+            frame = self.command_reader.read_frame()
+            if frame is None: # Capture stopped
+                return None
+            feed(frame)
+        
+        # The wake VAD has been tracking the room all along, so start from its noise floor
+        self.command_vad.reset()
+        if hasattr(self.wake_vad, "noise_floor"):
+            self.command_vad.noise_floor = self.wake_vad.noise_floor
+        
+        speech_started = False
+        waited = 0.0
+        heard = 0.0
+        end_of_speech = False
+        while not end_of_speech:
+            batch = self.command_reader.read_frames(max_frames=8)
+            if batch is None: # Capture stopped
+                return None
             
+            for frame, voice in zip(batch, self.command_vad.process(batch)):
+                feed(frame)
+                
+                # VAD endpointing; the detector's hangover absorbs pauses between words
+                if voice:
+                    speech_started = True
+                elif speech_started:
+                    end_of_speech = True
+                    break
+                else:
+                    waited += frame_duration
+                    if timeout is not None and waited > timeout:
+                        return None
+                
+                if speech_started:
+                    heard += frame_duration
+                    if heard > self.phrase_time_limit:
+                        self.logger.warning("Phrase time limit reached; ending the command.")
+                        end_of_speech = True
+                        break
+        
+        speech_ended_at = time.perf_counter()
+        if self.streaming_stt:
+            # Only the audio since the last partial is left to decode
+            segments.append(json.loads(self.vosk_recognizer.FinalResult())["text"])
+            transcribed_text = " ".join(segment for segment in segments if segment)
+        else:
+            audio = sr.AudioData(np.concatenate(frames).tobytes(), SAMPLE_RATE, 2)
             transcribed_text = json.loads(self.recognizer.recognize_vosk(audio_data=audio, language="en"))["text"]
-            
+        
+        self.logger.info(f"Transcript ready {(time.perf_counter() - speech_ended_at) * 1000:.1f}ms after end of speech.")
         
         return transcribed_text
+    
+    def get_input_level(self) -> float:
+        """
+        Gets the level of the most recent microphone frame. It reads the capture's newest samples
+        directly, so metering needs no reader of its own and never holds up the wake or command readers.
+        
+        @returns float - The RMS level in dBFS
+        """
+        frame = self.capture.latest(FRAME_SAMPLES).astype(np.float32)
+        if frame.size == 0:
+            return -np.inf
+        
+        rms = np.sqrt(np.mean(frame ** 2))
+        return float(20 * np.log10(max(rms, 1.0) / 32768.0))
         
         
 async def main():
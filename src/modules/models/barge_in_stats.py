@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+@dataclass
+class BargeInStats:
+    """Timing of interruptions: how fast TARS goes quiet once the wake phrase is heard over its own voice"""
+    budget: float = 0.3             # Longest acceptable time from detection to silence (seconds)
+    interruptions: int = 0          # Replies cut off by the wake phrase
+    over_budget: int = 0            # Interruptions that took longer than the budget
+    last_latency: float = None      # Seconds from detection to silence, last interruption
+    max_latency: float = 0.0        # Worst detection-to-silence time (seconds)
+    total_latency: float = 0.0      # Sum of detection-to-silence times (seconds)
+
+    def record(self, latency: float):
+        """Records the detection-to-silence time of one interruption."""
+        self.interruptions += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_latency += latency
+        if latency > self.budget:
+            self.over_budget += 1
+
+    @property
+    def mean_latency(self) -> float:
+        """Mean detection-to-silence time in seconds."""
+        return self.total_latency / self.interruptions if self.interruptions else 0.0
+
+    def __str__(self):
+        """Returns a string representation of the stats."""
+        last = f"{self.last_latency * 1000:.0f}ms" if self.last_latency is not None else "n/a"
+        return (f"interruptions={self.interruptions}, last={last}, mean={self.mean_latency * 1000:.0f}ms, "
+                f"max={self.max_latency * 1000:.0f}ms, over {self.budget * 1000:.0f}ms budget={self.over_budget}")
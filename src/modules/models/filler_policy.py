@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+@dataclass
+class FillerPolicy:
+    """When to play an acknowledgement filler while a reply is being generated"""
+    mode: str = "adaptive"              # "always", "never", or "adaptive" (only when the reply is expected to be slow)
+    min_expected_latency: float = 0.8   # Adaptive: play a filler if the reply is expected to take at least this long (seconds)
+    initial_latency: float = 1.5        # Expected reply latency before any has been measured (seconds)
+    smoothing: float = 0.3              # Weight of the newest measurement in the expected latency
+
+    def __post_init__(self):
+        """Validates the policy."""
+        if self.mode not in ("always", "never", "adaptive"):
+            raise ValueError(f"Invalid filler policy mode '{self.mode}' (expected 'always', 'never' or 'adaptive')")
+
+    def should_play(self, expected_latency: float) -> bool:
+        """Checks whether a filler should be played for a reply expected to take the given time."""
+        if self.mode == "always":
+            return True
+        if self.mode == "never":
+            return False
+        return expected_latency >= self.min_expected_latency
+
+    def __str__(self):
+        """Returns a string representation of the policy."""
+        if self.mode == "adaptive":
+            return f"adaptive (>= {self.min_expected_latency:.2f}s expected)"
+        return self.mode
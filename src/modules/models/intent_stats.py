@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+@dataclass
+class IntentStats:
+    """Counters for the local intent fast-path"""
+    hits: int = 0                  # Commands handled locally
+    misses: int = 0                # Commands sent to Gemini
+    match_time: float = 0.0        # Total seconds spent matching
+    cloud_latency: float = 0.0     # Moving average of a Gemini function call round trip, in seconds
+    latency_saved: float = 0.0     # Estimated seconds saved by the hits
+
+    def record_hit(self, match_time: float):
+        """Records a command handled locally, crediting it with the round trip it skipped."""
+        self.hits += 1
+        self.match_time += match_time
+        self.latency_saved += max(self.cloud_latency - match_time, 0.0)
+
+    def record_miss(self, match_time: float):
+        """Records a command sent to Gemini."""
+        self.misses += 1
+        self.match_time += match_time
+
+    def record_cloud_latency(self, latency: float, weight: float = 0.2):
+        """Updates the moving average of a Gemini round trip with a new measurement."""
+        self.cloud_latency = latency if self.cloud_latency == 0.0 else (1 - weight) * self.cloud_latency + weight * latency
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of commands handled locally."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        """Returns a string representation of the counters."""
+        total = self.hits + self.misses
+        return (f"hits={self.hits}, misses={self.misses} ({self.hit_ratio:.0%} local), "
+                f"avg match={self.match_time / total * 1000 if total else 0.0:.2f}ms, "
+                f"cloud round trip={self.cloud_latency * 1000:.0f}ms, latency saved={self.latency_saved:.1f}s")
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+@dataclass
+class SpeechPipelineStats:
+    """Timing of one pipelined TTS reply"""
+    segments: int = 0                   # Segments synthesized
+    time_to_first_audio: float = None   # Seconds from the first segment being queued to its audio starting
+    underruns: int = 0                  # Times the player ran dry waiting for the next segment
+    underrun_time: float = 0.0          # Total seconds of silence caused by underruns
+    audio_seconds: float = 0.0          # Seconds of audio played
+
+    def __str__(self):
+        """Returns a string representation of the stats."""
+        ttfa = f"{self.time_to_first_audio * 1000:.0f}ms" if self.time_to_first_audio is not None else "n/a"
+        return (f"segments={self.segments}, time to first audio={ttfa}, "
+                f"underruns={self.underruns} ({self.underrun_time * 1000:.0f}ms), audio={self.audio_seconds:.1f}s")
@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+import time
+
+@dataclass
+class StartupReport:
+    """Timing of each startup phase, relative to when startup began"""
+    started_at: float = field(default_factory=time.perf_counter)
+    phases: dict = field(default_factory=dict) # Phase name -> (start offset, end offset) in seconds
+    
+    def record(self, name: str, start: float, end: float):
+        """Records a phase from its time.perf_counter() start and end times."""
+        self.phases[name] = (start - self.started_at, end - self.started_at)
+    
+    def __str__(self):
+        """Returns a string representation of the phases, in the order they finished."""
+        lines = []
+        for name, (start, end) in sorted(self.phases.items(), key=lambda phase: phase[1][1]):
+            lines.append(f"  {name}: {start:.2f}s -> {end:.2f}s ({end - start:.2f}s)")
+        return "\n".join(lines)
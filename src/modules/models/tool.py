@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable
+
+class ToolMode(Enum):
+    """Where a tool's handler runs"""
+    INLINE = "inline"           # On the event loop (quick handlers only)
+    THREAD = "thread"           # On a worker thread; the caller waits for the result
+    BACKGROUND = "background"   # On a worker thread as a cancellable background task; the caller gets an acknowledgement straight away
+
+@dataclass
+class Tool:
+    """A function TARS can call, declared once on its handler"""
+    name: str
+    description: str
+    handler: Callable
+    mode: ToolMode = ToolMode.INLINE
+    group: str = None           # Tools in the same group never run at the same time (e.g. "motion")
+    parameters: dict = field(default_factory=dict) # Parameter name -> description
+
+    def __str__(self):
+        """Returns a string representation of the tool."""
+        group = f", group={self.group}" if self.group else ""
+        return f"{self.name} ({self.mode.value}{group})"
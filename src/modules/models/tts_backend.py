@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+@dataclass
+class TtsBackend:
+    """A speech synthesis backend TARS can route an utterance to"""
+    name: str                               # e.g. "gpt-4o-mini-tts", "tts-1", "pyttsx3"
+    local: bool = False                     # Synthesized on-device (no network, never circuit-broken)
+    supports_instructions: bool = False     # Accepts voice instructions (tone, pacing, ...)
+
+    def __str__(self):
+        """Returns a string representation of the backend."""
+        return f"{self.name} ({'local' if self.local else 'cloud'})"
@@ -0,0 +1,53 @@
+import collections
+from dataclasses import dataclass, field
+import numpy as np
+
+# Upper bounds of the latency histogram buckets, in seconds (the last bucket is everything slower)
+HISTOGRAM_BOUNDS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0)
+
+@dataclass
+class TtsBackendStats:
+    """Rolling latency and error rate of one TTS backend, plus a latency histogram over its lifetime"""
+    window: int = 20                                                    # Recent requests the rolling figures cover
+    requests: int = 0                                                   # Synthesis requests (cache hits never reach a backend)
+    errors: int = 0                                                     # Requests that failed or timed out
+    recent: collections.deque = None                                    # Latency of each recent request (None = error)
+    histogram: list = field(default_factory=lambda: [0] * (len(HISTOGRAM_BOUNDS) + 1)) # Successful requests per latency bucket
+
+    def __post_init__(self):
+        """Sizes the rolling window."""
+        if self.recent is None:
+            self.recent = collections.deque(maxlen=self.window)
+
+    def record_success(self, latency: float):
+        """Records a successful request and its time to first audio (seconds)."""
+        self.requests += 1
+        self.recent.append(latency)
+        self.histogram[int(np.searchsorted(HISTOGRAM_BOUNDS, latency))] += 1
+
+    def record_failure(self):
+        """Records a failed request."""
+        self.requests += 1
+        self.errors += 1
+        self.recent.append(None)
+
+    @property
+    def expected_latency(self) -> float:
+        """75th percentile of recent successful latencies in seconds (None before any)."""
+        latencies = [latency for latency in self.recent if latency is not None]
+        return float(np.percentile(latencies, 75)) if latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of recent requests that failed."""
+        return sum(latency is None for latency in self.recent) / len(self.recent) if self.recent else 0.0
+
+    def histogram_buckets(self) -> dict:
+        """Gets the latency histogram as bucket label -> count."""
+        labels = [f"<={bound * 1000:.0f}ms" for bound in HISTOGRAM_BOUNDS] + [f">{HISTOGRAM_BOUNDS[-1] * 1000:.0f}ms"]
+        return dict(zip(labels, self.histogram))
+
+    def __str__(self):
+        """Returns a string representation of the stats."""
+        expected = f"{self.expected_latency * 1000:.0f}ms" if self.expected_latency is not None else "n/a"
+        return f"requests={self.requests}, errors={self.errors}, p75={expected}, error rate={self.error_rate:.0%}"
@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+@dataclass
+class WakeDetection:
+    """Result of a streaming wake phrase detection"""
+    score: float            # Wake word score of the frame that fired
+    frame_index: int        # Index of the firing frame since listening started
+    audio_time: float       # Seconds of audio streamed before the detection
+    inference_time: float   # Seconds spent scoring the firing frame
+    latency: float          # Frame duration + inference time (worst case from last sample to detection)
+    position: int = 0       # Absolute capture position at the end of the firing frame
+    detected_at: float = 0.0 # time.perf_counter() when the detection fired
+    speaker: str = None     # Speaker whose verifier accepted the detection (None without verifiers)
+
+    def __str__(self):
+        """Returns a string representation of the detection."""
+        speaker = f"speaker={self.speaker}, " if self.speaker is not None else ""
+        return (f"{speaker}score={self.score:.3f}, frame={self.frame_index}, audio={self.audio_time:.2f}s, "
+                f"inference={self.inference_time * 1000:.1f}ms, latency={self.latency * 1000:.1f}ms")
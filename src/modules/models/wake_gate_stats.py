@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+
+@dataclass
+class WakeGateStats:
+    """Counters for the VAD gate in front of wake word inference"""
+    frames_skipped: int = 0     # Silent frames never shown to the wake word model
+    frames_scored: int = 0      # Frames scored by the wake word model
+    frames_replayed: int = 0    # Skipped frames replayed as context when the gate opened
+    
+    @property
+    def skip_ratio(self) -> float:
+        """Fraction of frames that skipped inference entirely."""
+        total = self.frames_skipped + self.frames_scored
+        return self.frames_skipped / total if total else 0.0
+    
+    def __str__(self):
+        """Returns a string representation of the counters."""
+        return (f"skipped={self.frames_skipped}, scored={self.frames_scored}, "
+                f"replayed={self.frames_replayed}, skip_ratio={self.skip_ratio:.1%}")
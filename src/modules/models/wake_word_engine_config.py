@@ -0,0 +1,44 @@
+from dataclasses import dataclass, fields
+import dotenv
+
+ENGINES = ("onnx", "tflite", "tflite_float16")
+GRAPH_OPTIMIZATION_LEVELS = ("disabled", "basic", "extended", "all")
+
+@dataclass
+class WakeWordEngineConfig:
+    """Inference engine settings for the wake word model"""
+    engine: str = "onnx"                    # One of ENGINES
+    intra_op_threads: int = 1               # ONNX Runtime threads within an operator
+    inter_op_threads: int = 1               # ONNX Runtime threads across operators
+    graph_optimization_level: str = "all"   # One of GRAPH_OPTIMIZATION_LEVELS (ONNX Runtime only)
+    tflite_threads: int = 1                 # TFLite interpreter threads (feature models and the wake word model)
+    
+    def __post_init__(self):
+        """Validates the settings."""
+        if self.engine not in ENGINES:
+            raise ValueError(f"Invalid wake word engine '{self.engine}' (expected one of {', '.join(ENGINES)})")
+        if self.graph_optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Invalid graph optimization level '{self.graph_optimization_level}' "
+                             f"(expected one of {', '.join(GRAPH_OPTIMIZATION_LEVELS)})")
+    
+    @classmethod
+    def from_env(cls, env_path: str = "../.env"):
+        """
+        Loads the settings from the .env file. Each field is read from WAKE_WORD_<FIELD NAME>
+        (e.g. WAKE_WORD_ENGINE=tflite, WAKE_WORD_INTRA_OP_THREADS=2); missing keys keep their defaults.
+        """
+        values = dotenv.dotenv_values(env_path)
+        overrides = {}
+        for field in fields(cls):
+            value = values.get(f"WAKE_WORD_{field.name.upper()}")
+            if value is not None:
+                overrides[field.name] = field.type(value)
+        
+        return cls(**overrides)
+    
+    def __str__(self):
+        """Returns a string representation of the settings."""
+        if self.engine == "onnx":
+            return (f"onnx (intra-op threads: {self.intra_op_threads}, inter-op threads: {self.inter_op_threads}, "
+                    f"graph optimization: {self.graph_optimization_level})")
+        return f"{self.engine} (threads: {self.tflite_threads})"
@@ -1,5 +1,6 @@
 import time
 import sys
+import threading
 import logging
 import math
 from modules.helpers.servo_logic import ServoController
@@ -15,7 +16,19 @@ logger = logging.getLogger('servo')
 
 #########################################################################
 
-def walk(TARS, steps:int, direction:str):
+class MotionStopped(Exception):
+    """Raised inside a motion sequence when its stop event is set"""
+
+def _pause(seconds: float, stop_event: threading.Event = None):
+    """
+    Sleeps between moves, raising MotionStopped as soon as the stop event is set.
+    """
+    if stop_event is None:
+        time.sleep(seconds)
+    elif stop_event.wait(seconds):
+        raise MotionStopped()
+
+def walk(TARS, steps:int, direction:str, stop_event: threading.Event = None):
     """
     TARS walk function
 
@@ -23,6 +36,7 @@ def walk(TARS, steps:int, direction:str):
         TARS: ServoController instance
         steps: Step count -- Alternates left and right stride
         direction: Forwards or Backwards
+        stop_event: Stops the sequence between moves once set (optional)
     """
     if not TARS.connected:
         logger.error("Not connected to PCA9685. Cannot perform walking sequence.")
@@ -54,7 +68,7 @@ def walk(TARS, steps:int, direction:str):
         TARS.set_servo_pulse(rv, down)
         TARS.set_servo_pulse(rh, start_pulse_right)
 
-        time.sleep(ts)
+        _pause(ts, stop_event)
 
         """ Theory
         To walk:
@@ -89,33 +103,33 @@ def walk(TARS, steps:int, direction:str):
                     # Left side operation
                     TARS.set_servo_pulse(lv, up)
                     TARS.move_servo_gradually(lh, start_pulse_left, end_pulse)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(lv, down)
                     TARS.set_servo_pulse(rv, up)
                     TARS.move_servo_gradually(rh, start_pulse_right, end_pulse)
                     TARS.move_servo_gradually(lh, end_pulse, start_pulse_left)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(rh, down)
                     TARS.move_servo_gradually(rh, end_pulse, start_pulse_right)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                 else:
                     # Right side operation
                     TARS.set_servo_pulse(rv, up)
                     TARS.move_servo_gradually(rh, start_pulse_right, end_pulse)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(rv, down)
                     TARS.set_servo_pulse(lv, up)
                     TARS.move_servo_gradually(lh, start_pulse_left, end_pulse)
                     TARS.move_servo_gradually(rh, end_pulse, start_pulse_right)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(lh, down)
                     TARS.move_servo_gradually(lh, end_pulse, start_pulse_left)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
             logger.info(f"Walked {steps} steps forward")
         elif direction == 'backward':
             # Math to get left and right movements 
@@ -125,37 +139,39 @@ def walk(TARS, steps:int, direction:str):
                     # Left side operation
                     TARS.set_servo_pulse(lv, up)
                     TARS.move_servo_gradually(lh, start_pulse_left, end_pulse)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(lv, down)
                     TARS.set_servo_pulse(rv, up)
                     TARS.move_servo_gradually(rh, start_pulse_right, end_pulse)
                     TARS.move_servo_gradually(lh, end_pulse, start_pulse_left)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(rh, down)
                     TARS.move_servo_gradually(rh, end_pulse, start_pulse_right)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                 else:
                     # Right side operation
                     TARS.set_servo_pulse(rv, up)
                     TARS.move_servo_gradually(rh, start_pulse_right, end_pulse)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(rv, down)
                     TARS.set_servo_pulse(lv, up)
                     TARS.move_servo_gradually(lh, start_pulse_left, end_pulse)
                     TARS.move_servo_gradually(rh, end_pulse, start_pulse_right)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
 
                     TARS.set_servo_pulse(lh, down)
                     TARS.move_servo_gradually(lv, end_pulse, start_pulse_left)
-                    time.sleep(ts)
+                    _pause(ts, stop_event)
             logger.info(f"Walked {steps} steps forward")
         else:
             logger.info("Not a valid direction")
         
+    except MotionStopped:
+        logger.info("Walk sequence stopped.")
     except Exception as e:
         logger.error(f"Error during walk sequence: {e}")
 
@@ -187,13 +203,14 @@ def turn(TARS, angle:int, direction:str):
     except Exception as e:
         logger.error(f"Error during turn sequence: {e}")
 
-def run_declaration(TARS, distance:int, direction:str):
+def run_declaration(TARS, distance:int, direction:str, stop_event: threading.Event = None):
     """
     TARS run function w/ PID
 
     Args:
         TARS: ServoController instancwe
         distance: Distance
+        stop_event: Stops the sequence between moves once set (optional)
     """
     if not TARS.connected:
         logger.error("Not connected to PCA9685. Cannot perform turning sequence.")
@@ -225,7 +242,7 @@ def run_declaration(TARS, distance:int, direction:str):
         TARS.set_servo_pulse(lh, start_pulse_left)
         TARS.set_servo_pulse(rv, down)
         TARS.set_servo_pulse(rh, start_pulse_right)
-        time.sleep(time_step)
+        _pause(time_step, stop_event)
 
         # PID setup
         pid = PID(kp=0.05, ki=0.0001, kd=0.002)
@@ -249,32 +266,32 @@ def run_declaration(TARS, distance:int, direction:str):
                 # Left step
                 TARS.set_servo_pulse(lv, up)
                 TARS.move_servo_gradually(lh, start_pulse_left, stride_pulse)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
 
                 TARS.set_servo_pulse(lv, down)
                 TARS.set_servo_pulse(rv, up)
                 TARS.move_servo_gradually(rh, start_pulse_right, stride_pulse)
                 TARS.move_servo_gradually(lh, stride_pulse, start_pulse_left)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
 
                 TARS.set_servo_pulse(rh, down)
                 TARS.move_servo_gradually(rh, stride_pulse, start_pulse_right)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
             else:
                 # Right step
                 TARS.set_servo_pulse(rv, up)
                 TARS.move_servo_gradually(rh, start_pulse_right, stride_pulse)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
 
                 TARS.set_servo_pulse(rv, down)
                 TARS.set_servo_pulse(lv, up)
                 TARS.move_servo_gradually(lh, start_pulse_left, stride_pulse)
                 TARS.move_servo_gradually(rh, stride_pulse, start_pulse_right)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
 
                 TARS.set_servo_pulse(lh, down)
                 TARS.move_servo_gradually(lh, stride_pulse, start_pulse_left)
-                time.sleep(time_step)
+                _pause(time_step, stop_event)
 
             step += 1
             distance_walked += base_stride_cm * stride_modifier
@@ -282,6 +299,8 @@ def run_declaration(TARS, distance:int, direction:str):
         time_elapsed = time.perf_counter() - start_time
         logger.info(f"Finished walking ~{distance_walked:.2f}cm in {step} steps | Output: {output:.2f} | Elapsed time: {time_elapsed:.4f} seconds")
 
+    except MotionStopped:
+        logger.info("Run sequence stopped.")
     except Exception as e:
         logger.error(f"Error during run sequence: {e}")
 
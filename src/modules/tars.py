@@ -3,116 +3,28 @@ from modules.listen_controller import ListenController
 from modules.convo_controller import ConvoController
 from modules.tts_controller import TtsController
 from modules.models.personality_parameters import PersonalityParameters
-import logging, threading, queue
+from modules.models.startup_report import StartupReport
+from modules.models.barge_in_stats import BargeInStats
+from modules.models.wake_detection import WakeDetection
+from modules.helpers.intent_matcher import IntentMatcher
+from modules.helpers.filler_bank import FillerBank
+from modules.models.filler_policy import FillerPolicy
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio, logging, threading, time, queue
 from google.genai import types
 from modules.tars_tools import TarsTools
 import sounddevice
 from modules.servo_controller import walk, run_declaration 
+from modules.helpers.tool_registry import ToolRegistry, tool
+from modules.models.tool import ToolMode
+from typing import Literal
 
 from modules.text_controller import run_gui
 
-
-update_personality_declaration = {
-    "name": "update_personality",
-    "description": "Update or set a personality parameter for TARS.",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "parameter": {
-                "type": "string",
-                "description": "The personality parameter to update (e.g., 'humor', 'sarcasm')."
-            },
-            "value": {
-                "type": "number",
-                "description": "The new value for the personality parameter (expected to be between 0.0 and 1.0)."
-            }
-        },
-        "required": ["parameter", "value"]
-    }
-}
-
-get_weather_declaration = {
-    "name": "get_weather",
-    "description": "Get the current weather information for a given location. Returns dummy weather data.",
-    "parameters": {
-        "type": "object"
-    }
-}
-
-walk_declaration = {
-    "name": "walk",
-    "description": "Walk in a particular direction.",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "direction": {
-                "type": "string",
-                "description": "The direction to walk in.",
-                "enum": ["forward", "backward"]
-            },
-            "steps": {
-                "type": "number",
-                "description": "The amount of steps."
-            }
-        },
-        "required": ["direction", "steps"]
-    }
-}
-
-run_dec = {
-    "name": "run_dec",
-    "description": "Run a particular distance.",
-    "parameters": {
-        "type": "object",
-        "properties": {
-            "direction": {
-                "type": "string",
-                "description": "The direction to run in.",
-                "enum": ["forward", "backward"]
-            },
-            "distance": {
-                "type": "number",
-                "description": "The distance in centimeters."
-            }
-        },
-        "required": ["direction", "distance"]
-    }
-}
-
-shutdown = {
-    "name": "shutdown",
-    "description": "Terminates the program.",
-    "parameters": {
-        "type": "object",
-    }
-}
-
-diagnostics = {
-    "name": "diagnostics",
-    "description": "Performs a diagnostics check on the system.",
-    "parameters": {
-        "type": "object"
-    }
-}
-
-wave = {
-    "name": "wave",
-    "description": "Waves at the user.",
-    "parameters": {
-        "type": "object",
-    }
-}
-
-clear_conversation = {
-    "name": "clear_conversaion",
-    "description": "Clears the conversation history.",
-    "parameters": {
-        "type": "object"
-    }
-}
+MAX_FUNCTION_ROUNDS = 5 # Follow-up responses that may call functions again before TARS stops performing them
 
 class TARS:
-    def __init__(self, env_path: str = "../.env"):
+    def __init__(self, env_path: str = "../.env", filler_policy: FillerPolicy = None):
         # Configure logging
         self.logger = logging.getLogger('tars')
         self.logger.info("Initializing TARS...")
@@ -123,23 +35,70 @@ class TARS:
         # Initialize personality
         self.personality_parameters = PersonalityParameters()
         
-        # Initailize controllers
-        self.listen_controller = ListenController(env_path=env_path)
-        self.convo_controller = ConvoController(env_path=env_path, function_declarations=[
-            update_personality_declaration, 
-            get_weather_declaration, 
-            diagnostics, 
-            wave, 
-            shutdown,
-            walk_declaration,
-            run_dec,
-            clear_conversation])
-        self.tts_controller = TtsController(env_path=env_path)
-        self.servo_controller = ServoController()
+        # Functions TARS can call (declared on the action_* methods below)
+        self.tools = ToolRegistry()
+        self.tools.register_object(self)
+        self._clear_requested = False # Set by clear_conversation; the memory is cleared once the exchange is over
+        
+        # Known commands are matched on-device and skip the Gemini round trip
+        self.intent_matcher = IntentMatcher()
+        
+        # Acknowledgement fillers played while a reply is generated (loaded once TTS is ready)
+        self.filler_policy = filler_policy or FillerPolicy()
+        self.filler_bank: FillerBank = None
+        self._command_ended_at = None # When the last command finished, until its first reply audio
+        
+        # Replies can be interrupted by the wake phrase; this tracks how quickly TARS goes quiet
+        self.barge_in_stats = BargeInStats()
+        
+        # Initialize controllers concurrently; none of them depend on each other
+        self.startup_report = StartupReport()
+        self._init_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tars_init")
+        self._controller_futures: dict[str, Future] = {
+            "listen_controller": self._start_phase("listen_controller", lambda: ListenController(env_path=env_path)),
+            "convo_controller": self._start_phase("convo_controller", lambda: ConvoController(env_path=env_path, function_declarations=self.tools.declarations())),
+            "tts_controller": self._start_phase("tts_controller", lambda: TtsController(env_path=env_path)),
+            "servo_controller": self._start_phase("servo_controller", ServoController),
+        }
         
         # Log the initialization
-        self.logger.info("TARS initialized successfully.")
+        self.logger.info("TARS initialization started; controllers are loading in the background.")
+    
+    def _start_phase(self, name: str, factory) -> Future:
+        """Runs a startup phase on the init executor, recording its timing."""
+        def run():
+            started = time.perf_counter()
+            try:
+                return factory()
+            finally:
+                self.startup_report.record(name, started, time.perf_counter())
         
+        return self._init_executor.submit(run)
+    
+    async def _wait_for_controllers(self):
+        """Waits for every controller to finish initializing."""
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in self._controller_futures.values()))
+        self._init_executor.shutdown(wait=False)
+    
+    @property
+    def listen_controller(self) -> ListenController:
+        return self._controller_futures["listen_controller"].result()
+    
+    @property
+    def convo_controller(self) -> ConvoController:
+        return self._controller_futures["convo_controller"].result()
+    
+    @property
+    def tts_controller(self) -> TtsController:
+        return self._controller_futures["tts_controller"].result()
+    
+    @property
+    def servo_controller(self) -> ServoController:
+        return self._controller_futures["servo_controller"].result()
+        
+    @tool("Update or set a personality parameter for TARS.", name="update_personality", parameters={
+        "parameter": "The personality parameter to update (e.g., 'humor', 'sarcasm').",
+        "value": "The new value for the personality parameter (expected to be between 0.0 and 1.0)."})
     def action_update_personality(self, parameter: str, value: float):
         """Updates the personality parameter for TARS"""
         try:
@@ -148,7 +107,15 @@ class TARS:
             self.logger.info(f"Personality parameter '{parameter}' updated to {value}.")
         except ValueError as e:
             self.logger.error(e)
-            
+    
+    @tool("Get the current weather information for a given location. Returns dummy weather data.", name="get_weather", mode=ToolMode.THREAD)
+    def action_get_weather(self):
+        """Gets the weather information"""
+        weather_info = TarsTools.get_weather()
+        self.logger.info(f"Weather information: {weather_info}")
+        return weather_info
+    
+    @tool("Terminates the program.", name="shutdown")
     def action_shutdown(self):
         """Shuts down the program"""
         # self.logger.info("Shutting down TARS...")
@@ -157,105 +124,266 @@ class TARS:
         # exit(0)
         pass
     
+    @tool("Performs a diagnostics check on the system.", name="diagnostics", mode=ToolMode.THREAD, group="motion")
     def action_diagnostics(self):
         """Moves both arms up and down to check the motors"""
         # TODO: implement the diagnostics check action
         return "Diagnostics check complete."
     
+    @tool("Waves at the user.", name="wave", mode=ToolMode.THREAD, group="motion")
     def action_wave(self):
         """Moves the arm to wave at the user"""
         # TODO: implement the wave action
         return "Waving at the user."
     
-    def action_clear_conversaion(self):
-        """Clears the conversaion history"""
+    @tool("Clears the conversation history.", name="clear_conversation")
+    def action_clear_conversation(self):
+        """Clears the conversation history"""
         
-        self.convo_controller.reset_memory()
+        # The exchange this was called in is still being recorded, so the memory is reset once it is over
+        self._clear_requested = True
         self.gui_queue.put({"clear": True})
         
         return "Conversation history cleared."
     
-    def action_run(self):
+    @tool("Run a particular distance.", name="run_dec", mode=ToolMode.BACKGROUND, group="motion", parameters={
+        "direction": "The direction to run in.",
+        "distance": "The distance in centimeters."})
+    def action_run(self, direction: Literal["forward", "backward"], distance: float, stop_event: threading.Event = None):
         """Runs the bot"""
         
-        run_declaration(self.servo_controller, 5, "forward")
+        run_declaration(self.servo_controller, distance, direction, stop_event)
         
         return "Running successful."
     
-    def action_walk(self):
+    @tool("Walk in a particular direction.", name="walk", mode=ToolMode.BACKGROUND, group="motion", parameters={
+        "direction": "The direction to walk in.",
+        "steps": "The amount of steps."})
+    def action_walk(self, direction: Literal["forward", "backward"], steps: int, stop_event: threading.Event = None):
         """Walks the bot"""
         
-        walk(self.servo_controller, 5, "forward")
+        walk(self.servo_controller, steps, direction, stop_event)
         
         return "Walking successful."
+    
+    @tool("Stops any movement (walking, running) in progress.", name="stop")
+    def action_stop(self):
+        """Stops the running and queued motion tools"""
+        stopped = self.tools.cancel(group="motion")
+        return f"Stopped {stopped} movement(s)." if stopped else "Nothing to stop."
+        
+    async def stream_reply(self, request):
+        """
+        Runs a streaming ConvoController request, sending each sentence to the GUI and TTS as soon as
+        it arrives, so the first words play while the rest is still being generated.
+        
+        @param request - Called with an `on_segment` callback; returns the streaming coroutine
+        @returns The result of the request
+        """
+        # Segments are synthesized as they arrive, a few ahead of the player, and played gaplessly
+        pipeline = self.tts_controller.pipeline(self.personality_parameters)
+        spoke = False
+        
+        def on_segment(segment: str):
+            nonlocal spoke
+            spoke = True
+            # Shown the moment it starts playing, so the text keeps pace with the voice
+            pipeline.add(segment, on_start=lambda: self.gui_queue.put({"text": segment + " "}))
+        
+        player = asyncio.create_task(pipeline.play(on_first_audio=self.reply_ready))
+        try:
+            result = await request(on_segment)
+        except BaseException:
+            # Cancelled or failed: stop speaking straight away too
+            player.cancel()
+            raise
+        
+        # Let the queued sentences finish playing
+        pipeline.finish()
+        await player
+        if spoke:
+            self.gui_queue.put({"text": "\n"})
+        return result
+    
+    async def reply_ready(self):
+        """
+        Called right before the first reply audio of a command: cuts off the filler and measures how
+        long the reply took, so the filler policy knows what to expect next time.
+        """
+        if self.filler_bank is not None and self._command_ended_at is not None:
+            self.filler_bank.record_latency(time.perf_counter() - self._command_ended_at)
+        await self.stop_filler()
+    
+    async def stop_filler(self):
+        """
+        Cuts off the filler without measuring anything (the reply timed out, failed or was interrupted
+        before any audio played).
+        """
+        if self.filler_bank is not None:
+            await self.filler_bank.stop()
+        self._command_ended_at = None
+    
+    async def _load_fillers(self):
+        """Synthesizes the filler bank (a startup phase)."""
+        started = time.perf_counter()
+        filler_bank = FillerBank(self.tts_controller, self.filler_policy)
+        try:
+            await filler_bank.load()
+            self.filler_bank = filler_bank
+        except Exception as e:
+            self.logger.error(f"Could not load the filler bank; continuing without fillers: {e}")
+        self.startup_report.record("filler_bank", started, time.perf_counter())
+    
+    async def perform_function_calls(self, function_calls: list[types.FunctionCall]) -> list[tuple]:
+        """
+        Performs every function call from one response concurrently through the tool registry.
+        Motion tools share the servos, so they run one at a time in the order they were requested.
         
-    def perform_function_call(self, function_call: types.FunctionCall):
-        """Performs the function call using the TARS tools"""
-        self.logger.info(f"Performing function call: {function_call.name} with arguments: {function_call.args}")
+        @returns list[tuple] - (function call, result) pairs, in the order of the calls
+        """
+        async def perform(function_call: types.FunctionCall):
+            self.logger.info(f"Performing function call: {function_call.name} with arguments: {function_call.args}")
+            try:
+                return await self.tools.call(function_call.name, function_call.args)
+            except KeyError:
+                self.logger.error(f"Unknown function call: {function_call.name}")
+                return f"Error: unknown function '{function_call.name}'"
+            except Exception as e:
+                self.logger.error(f"Function call {function_call.name} failed: {e}")
+                return f"Error: {e}"
         
-        args = function_call.args  # This should be a dictionary
+        # Each call takes its turn in its tool group before its first await, so motion tools run in the order they were requested
+        results = await asyncio.gather(*(perform(function_call) for function_call in function_calls))
+        return list(zip(function_calls, results))
+    
+    async def handle_local_intent(self, user_command: str, function_call: types.FunctionCall):
+        """
+        Performs a function call matched on-device and confirms it, without a Gemini round trip.
+        """
+        [(_, result)] = await self.perform_function_calls([function_call])
         
         if function_call.name == "update_personality":
-            parameter = args.get("parameter")
-            value = args.get("value")
-            self.action_update_personality(parameter, value)
-                
-        if function_call.name == "get_weather": 
-            weather_info = TarsTools.get_weather()
-            
-            # Log the weather information
-            self.logger.info(f"Weather information: {weather_info}")
-            
-            return weather_info
+            reply = f"{function_call.args['parameter'].capitalize()} set to {function_call.args['value']:.0%}."
+        else:
+            reply = result if isinstance(result, str) else "Done."
         
-        if function_call.name == "diagnostics": 
-            ret = self.action_diagnostics()
-            
-            # Log
-            self.logger.info(f"Diagnostics: {ret}")
-            
-            return ret
+        # Keep the conversation memory aware of what happened
+        self.convo_controller.record_exchange(user_command, function_call, result, reply)
+        self._clear_memory_if_requested()
+        self.logger.info(f"Intent fast-path: {self.intent_matcher.stats}")
         
-        if function_call.name == "shutdown": 
-            ret = self.action_shutdown()
-            
-            # Log
-            self.logger.info(f"Shutting down: {ret}")
-            
-            return ret
+        self.gui_queue.put(reply)
+        await self.tts_controller.speak(reply, self.personality_parameters)
+    
+    def _clear_memory_if_requested(self):
+        """Resets the conversation memory if clear_conversation was called in the exchange that just ended."""
+        if self._clear_requested:
+            self._clear_requested = False
+            self.convo_controller.reset_memory()
+    
+    async def respond(self, user_command: str):
+        """Generates and speaks the reply to a command, performing any function calls in it."""
+        # Cover the wait for Gemini and TTS with a filler, if the policy expects it to be noticeable
+        self._command_ended_at = time.perf_counter()
+        if self.filler_bank is not None:
+            self.filler_bank.start(self.personality_parameters)
         
-        if function_call.name == "wave": 
-            ret = self.action_wave()
+        # Generate a response using Gemini, speaking each sentence as soon as it has been generated
+        try:
+            started = time.perf_counter()
+            response_text, function_calls = await self.stream_reply(
+                lambda on_segment: self.convo_controller.stream_message(user_command, on_segment, self.personality_parameters))
             
-            # Log
-            self.logger.info(f"Waving: {ret}")
+            if function_calls:
+                self.intent_matcher.stats.record_cloud_latency(time.perf_counter() - started)
             
-            return ret
+            # Perform every function call in the response, then send all the results back at once. The reply
+            # to the results may call functions again, so keep going until it doesn't.
+            for _ in range(MAX_FUNCTION_ROUNDS):
+                if not function_calls:
+                    break
+                self.logger.info(f"Function calls detected: {', '.join(call.name for call in function_calls)}")
+                results = await self.perform_function_calls(function_calls)
+                if any(result is not None for _, result in results):
+                    response_text, function_calls = await self.stream_reply(
+                        lambda on_segment: self.convo_controller.stream_function_results(results, on_segment))
+                else:
+                    # Nothing to say about them, but every call still needs its response in the history
+                    self.convo_controller.record_function_results(results)
+                    function_calls = []
+            else:
+                if function_calls:
+                    self.logger.warning(f"Still calling functions after {MAX_FUNCTION_ROUNDS} rounds; ignoring: "
+                                        f"{', '.join(call.name for call in function_calls)}")
+                    self.convo_controller.drop_unanswered_function_calls()
+        except asyncio.TimeoutError:
+            self.convo_controller.drop_unanswered_function_calls()
+            self.logger.warning("Timed out waiting for a response from Gemini.")
+            return
+        except asyncio.CancelledError:
+            # Interrupted (e.g. barge-in) while the calls ran: their results will never be sent
+            self.convo_controller.drop_unanswered_function_calls()
+            raise
+        except Exception as e:
+            # Keep listening for the next command whatever went wrong with this one
+            self.convo_controller.drop_unanswered_function_calls()
+            self.logger.error(f"Failed to respond to '{user_command}': {e!r}")
+            return
+        finally:
+            # Nothing was spoken (e.g. only function calls): don't leave the filler running
+            await self.stop_filler()
+            self._clear_memory_if_requested()
         
-        if function_call.name == "walk": 
-            ret = self.action_walk()
-            
-            # Log
-            self.logger.info(f"Walking: {ret}")
-            
-            return ret
+        self.logger.info(f"Intent fast-path: {self.intent_matcher.stats}")
+        self.logger.info(f"TTS backends:\n{self.tts_controller.router}")
         
-        if function_call.name == "run_dec": 
-            ret = self.action_run()
-            
-            # Log
-            self.logger.info(f"Running: {ret}")
-            
-            return ret
+        # Print the response
+        self.logger.info("=== REPLY FROM TARS ===")
+        self.logger.info(f'"{response_text}"')
+        self.logger.info("=== END OF MESSAGE ===")
+    
+    async def with_barge_in(self, coroutine) -> WakeDetection:
+        """
+        Runs a coroutine that speaks while listening for the wake phrase (with TARS' own voice
+        suppressed). If the user says it, the coroutine is cancelled and playback cut off.
         
-        if function_call.name == "clear_conversation": 
-            ret = self.action_clear_conversaion()
-            
-            # Log
-            self.logger.info(f"Cleared conversation: {ret}")
+        @returns WakeDetection - The detection that interrupted it, or None if it finished
+        """
+        stop_listening = threading.Event()
+        listening = asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.listen_controller.listen_for_wake_phrase(stop_event=stop_listening))
+        task = asyncio.ensure_future(coroutine)
+        
+        try:
+            await asyncio.wait((task, listening), return_when=asyncio.FIRST_COMPLETED)
+            detection = listening.result() if listening.done() else None
+            if detection is None:
+                # Finished uninterrupted (or capture stopped); the listener must let go of the microphone first
+                stop_listening.set()
+                await task
+                await listening
+                return None
             
-            return ret
+            # Interrupted: stop generating and go quiet straight away
+            task.cancel()
+            output = self.tts_controller.output
+            silent_at = output.audible_at(output.cut())
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
             
+            self.barge_in_stats.record(silent_at - detection.detected_at)
+            self.logger.info(f"Barge-in ({detection}): silent {self.barge_in_stats.last_latency * 1000:.0f}ms after detection "
+                             f"[{self.barge_in_stats}]")
+            if self.barge_in_stats.last_latency > self.barge_in_stats.budget:
+                self.logger.warning("Barge-in took longer than its budget.")
+            return detection
+        finally:
+            stop_listening.set()
+            task.cancel()
+            # Whatever happened, don't return while the listener thread is still using the wake word model
+            await asyncio.wait((listening,))
     
     async def run(self):
         """Runs the program"""
@@ -264,18 +392,34 @@ class TARS:
         gui_thread = threading.Thread(target=run_gui, args=(self.gui_queue,), daemon=True)
         gui_thread.start()
         
+        # Speak as soon as TTS is ready; the other controllers keep loading in the meantime
+        await asyncio.wrap_future(self._controller_futures["tts_controller"])
+        fillers_loaded = asyncio.create_task(self._load_fillers())
+        started = time.perf_counter()
         await self.tts_controller.speak("I am now online.", self.personality_parameters)
+        self.startup_report.record("online_announcement", started, time.perf_counter())
+        
+        await self._wait_for_controllers()
+        await fillers_loaded
+        self.startup_report.record("startup", self.startup_report.started_at, time.perf_counter())
+        self.logger.info(f"TARS initialized successfully. Startup timing:\n{self.startup_report}")
+        
+        # Keep TARS' own voice out of the wake word model, so it can be interrupted mid-reply
+        self.listen_controller.enable_echo_suppression(self.tts_controller.output)
+        
+        interruption = None
         while True:
             
-            # Wait for the wake phrase
-            detected = self.listen_controller.listen_for_wake_phrase()
+            # Wait for the wake phrase (unless it was just heard interrupting a reply), off the event loop so background tools keep running
+            detected = interruption or await asyncio.to_thread(self.listen_controller.listen_for_wake_phrase)
+            interruption = None
             
             # Check if the transcript contains wake word(s)/phrase(s)
             if not detected:
                 self.logger.warning("Wake phrase not detected. Please try again.")
                 continue
             
-            self.logger.info("Wake phrase detected!")
+            self.logger.info(f"Wake phrase detected! ({detected})")
             print('\a')  # Beep sound
                 
             # TODO: Lean forward and listen for the command
@@ -284,7 +428,7 @@ class TARS:
             self.gui_queue.put({"listening": True})
 
             # Listen for the command after the wake word has been detected
-            user_command = self.listen_controller.listen_for_command()
+            user_command = await asyncio.to_thread(self.listen_controller.listen_for_command, wake_detection=detected)
             
             # Send GUI update again
             self.gui_queue.put({"listening": False})
@@ -295,31 +439,11 @@ class TARS:
                 self.logger.warning("No command detected. Please try again.")
                 continue
             
-            # Generate a repsonse using Gemini
-            response = self.convo_controller.send_message(
-                msg={user_command},
-                personality_parameters=self.personality_parameters
-            )
-            
-            response_text = response[0]
-            response_function_call = response[1]
-            
-            if response_function_call is not None:
-                # Perform the function call if it exists
-                self.logger.info(f"Function call detected: {response_function_call.name}")
-                result = self.perform_function_call(response_function_call)
-                if result is not None:
-                    response = self.convo_controller.send_function_result(response_function_call, result)
-                    response_text = response
-            
-            # Print the response
-            self.logger.info("=== REPLY FROM TARS ===")
-            self.logger.info(f'"{response_text}"')
-            self.logger.info("=== END OF MESSAGE ===")
-            
-            # Send the response text to the GUI (thread-safe)
-            self.gui_queue.put(response_text)
-            
-            # Speak the response using TTS
-            await self.tts_controller.speak(response_text, self.personality_parameters)
+            # Known command: perform it straight away without asking Gemini
+            local_call = self.intent_matcher.match(user_command)
+            if local_call is not None:
+                interruption = await self.with_barge_in(self.handle_local_intent(user_command, local_call))
+                continue
             
+            # Reply, still listening for the wake phrase so the user can cut TARS off
+            interruption = await self.with_barge_in(self.respond(user_command))
@@ -50,6 +50,9 @@ class TypingEffectApp:
                         self.full_text = ""
                         self.index = 0
                         self.label.config(text=self.full_text)
+                    # Streamed text (appended as-is, so sentences of one reply stay on one line)
+                    elif "text" in new_message:
+                        self.full_text += new_message["text"]
                     # Check for listening indicator.
                     elif "listening" in new_message:
                         self.update_listening_light(new_message["listening"])
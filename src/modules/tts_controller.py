@@ -1,12 +1,20 @@
-import pyttsx3 as tts
 import sounddevice
-import dotenv, logging
+import asyncio, dotenv, logging, time, numpy as np
+from typing import Callable
 from openai import AsyncOpenAI
-from openai.helpers import LocalAudioPlayer
+from modules.helpers.audio_output import AudioOutput
+from modules.helpers.local_tts import LocalTtsEngine
+from modules.helpers.tts_router import TtsRouter
+from modules.helpers.tts_cache import DEFAULT_CACHE_DIR, TtsCache
+from modules.helpers.sentence_segmenter import SentenceSegmenter
+from modules.helpers.speech_pipeline import SpeechPipeline
 from modules.models.personality_parameters import PersonalityParameters
+from modules.models.tts_backend import TtsBackend
 
 class TtsController():
-    def __init__(self, env_path: str = "../.env", offline: bool = False):
+    def __init__(self, env_path: str = "../.env", offline: bool = False, cache_dir: str = DEFAULT_CACHE_DIR,
+                 cache_max_bytes: int = 200 * 1024 * 1024, max_in_flight: int = 3, output_buffer_seconds: float = 2.0,
+                 latency_budget: float = 1.5):
         # Initialize logger
         self.logger = logging.getLogger('tts_controller')
         self.logger.info("Initializing TTSController...")
@@ -15,9 +23,26 @@ class TtsController():
         self.api_key = dotenv.get_key(dotenv_path=env_path, key_to_get="OPENAI_API_KEY")
         self.client = AsyncOpenAI(api_key=self.api_key)
         
-        # Initialize offline TTS
+        # Initialize offline TTS (also the fallback when the cloud is slow or down); the engine only starts when first used
         self.offline = offline
-        self.tts_engine = tts.init() # CONSIDER: Could conditionally init based on the offline flag
+        self.local_engine = LocalTtsEngine()
+        
+        # Backends in order of preference; each utterance goes to the best one that fits the latency budget
+        local = TtsBackend("pyttsx3", local=True)
+        self.router = TtsRouter([local] if offline else [
+            TtsBackend("gpt-4o-mini-tts", supports_instructions=True),
+            TtsBackend("tts-1"),
+            local,
+        ], latency_budget=latency_budget)
+        
+        # Synthesized speech is cached on disk, so repeated utterances never go back to the API
+        self.voice = "onyx"
+        self.cache = TtsCache(cache_dir, cache_max_bytes)
+        self.max_in_flight = max_in_flight # Synthesis requests kept ahead of playback
+        
+        # One output stream for everything TARS says, opened once instead of per utterance
+        self.output = AudioOutput(sample_rate=24_000, buffer_seconds=output_buffer_seconds)
+        self.output.start()
         
         # Set voice properties
         self.tone = "N/A"
@@ -30,14 +55,8 @@ class TtsController():
         # Log
         self.logger.info("TTSController initialized successfully.")
 
-    async def speak(self, text, personality_parameters: PersonalityParameters = None):
-        """Speaks the given text using TTS."""
-        if self.offline:
-            # Use offline TTS engine
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-            return
-        
+    def instructions(self, personality_parameters: PersonalityParameters = None) -> str:
+        """Builds the voice instructions for the TTS model."""
         _instructions = f"""Voice Affect: {self.voice_affect}
             Tone: {self.tone}
             Pacing: {self.pacing}
@@ -47,15 +66,137 @@ class TtsController():
         
         if personality_parameters is not None:
             _instructions += f"\nPersonality Parameters:\n{personality_parameters}"
-        
+        return _instructions
+    
+    def _cache_key(self, text: str, backend: TtsBackend, instructions: str) -> str:
+        """Gets the cache key of an utterance from a backend."""
+        if backend.local:
+            return TtsCache.key(text, "default", backend.name, None)
+        return TtsCache.key(text, self.voice, backend.name, instructions if backend.supports_instructions else None)
+    
+    async def _synthesize_cloud(self, text: str, backend: TtsBackend, instructions: str, on_chunk: Callable[[np.ndarray], None] = None) -> np.ndarray:
+        """Synthesizes speech with an OpenAI model, handing each chunk of samples to `on_chunk` as it arrives."""
+        chunks = []
+        pending = b"" # A sample split across two chunks
         async with self.client.audio.speech.with_streaming_response.create(
-            model="gpt-4o-mini-tts",#"tts-1",
-            voice="onyx",
+            model=backend.name,
+            voice=self.voice,
             input=text,
-            instructions=_instructions,
-            response_format="pcm"
+            response_format="pcm",
+            **({"instructions": instructions} if backend.supports_instructions else {})
         ) as response:
-            await LocalAudioPlayer().play(response)
+            async for chunk in response.iter_bytes():
+                data = pending + chunk
+                whole = len(data) - len(data) % 2
+                pending = data[whole:]
+                if whole:
+                    samples = np.frombuffer(data[:whole], dtype=np.int16)
+                    chunks.append(samples)
+                    if on_chunk is not None:
+                        on_chunk(samples)
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+    
+    async def synthesize(self, text, personality_parameters: PersonalityParameters = None, on_chunk: Callable[[np.ndarray], None] = None) -> np.ndarray:
+        """
+        Synthesizes speech with the backend the router picks (falling back to the next one if it
+        fails), from the cache if it has been synthesized before.
+        
+        @param on_chunk - Called with the audio as it becomes available: chunk by chunk while a cloud
+            backend streams it, otherwise all at once
+        @returns np.ndarray - 24 kHz int16 mono samples
+        """
+        _instructions = self.instructions(personality_parameters)
+        
+        def deliver(audio: np.ndarray) -> np.ndarray:
+            if on_chunk is not None:
+                on_chunk(audio)
+            return audio
+        
+        # Cache hit: the memory-mapped file is played straight away, no API call. Cached cloud audio
+        # is used even while its backend is broken; local audio only when local synthesis is chosen
+        started = time.perf_counter()
+        for backend in self.router.backends:
+            if backend.local:
+                continue
+            audio = self.cache.get(self._cache_key(text, backend, _instructions))
+            if audio is not None:
+                self.logger.debug(f"TTS cache hit ({backend.name}, {(time.perf_counter() - started) * 1000:.1f} ms): '{text}'")
+                return deliver(audio)
+        
+        for backend in self.router.candidates():
+            key = self._cache_key(text, backend, _instructions)
+            if backend.local and (audio := self.cache.get(key)) is not None:
+                return deliver(audio)
+            
+            # A half-open backend takes one probe at a time; concurrent segments move on to the next backend
+            if not self.router.claim(backend):
+                continue
+            
+            # Latency is the time to the first audio (a cloud backend's first streamed chunk), so long
+            # sentences don't count against a backend that starts speaking quickly
+            started = time.perf_counter()
+            first_audio_at = None
+            
+            def stream(chunk: np.ndarray):
+                nonlocal first_audio_at
+                if first_audio_at is None:
+                    first_audio_at = time.perf_counter()
+                deliver(chunk)
+            
+            try:
+                if backend.local:
+                    audio = await asyncio.wait_for(self.local_engine.synthesize(text), timeout=self.router.timeout)
+                else:
+                    audio = await asyncio.wait_for(self._synthesize_cloud(text, backend, _instructions, stream), timeout=self.router.timeout)
+            except asyncio.CancelledError:
+                self.router.record_cancelled(backend)
+                raise
+            except Exception as e:
+                self.router.record_failure(backend, e)
+                if first_audio_at is not None:
+                    # Part of it may already be playing, so another backend can't start it over
+                    raise
+                continue
+            
+            latency = (first_audio_at or time.perf_counter()) - started
+            self.router.record_success(backend, latency)
+            if first_audio_at is None:
+                deliver(audio)
+            await asyncio.to_thread(self.cache.put, key, audio.tobytes())
+            self.logger.debug(f"Synthesized with {backend.name} ({latency * 1000:.0f} ms to first audio): '{text}' [{self.cache}]")
+            return audio
+        
+        raise RuntimeError(f"No TTS backend could synthesize '{text}'")
+    
+    async def play(self, audio: np.ndarray) -> int:
+        """
+        Queues synthesized speech on the output stream and waits for it to finish playing (or be cut off).
+        
+        @returns int - The output position the audio started at
+        """
+        start = await self.output.write(audio)
+        await self.output.wait_until(min(start + len(audio), self.output.write_position)) # Shorter if it was cut off while writing
+        return start
+    
+    def pipeline(self, personality_parameters: PersonalityParameters = None) -> SpeechPipeline:
+        """
+        Creates a pipeline for a reply whose segments are synthesized ahead of playback.
+        """
+        return SpeechPipeline(self, personality_parameters, self.max_in_flight)
+
+    async def speak(self, text, personality_parameters: PersonalityParameters = None):
+        """Speaks the given text using TTS (longer text is split into sentences and pipelined)."""
+        segmenter = SentenceSegmenter()
+        segments = segmenter.feed(text + " ")
+        remaining = segmenter.flush()
+        if remaining is not None:
+            segments.append(remaining)
+        
+        pipeline = self.pipeline(personality_parameters)
+        for segment in segments:
+            pipeline.add(segment)
+        pipeline.finish()
+        await pipeline.play()
 
 async def main():
     # Init .env file